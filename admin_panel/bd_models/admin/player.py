@@ -13,7 +13,14 @@ from django_admin_inline_paginator.admin import TabularInlinePaginated
 from admin_panel.webhook import notify_admins
 
 from ..forms import BlacklistActionForm, BlacklistedListFilter
-from ..models import BallInstance, BlacklistedID, BlacklistHistory, GuildConfig, Player
+from ..models import (
+    BallInstance,
+    BlacklistedID,
+    BlacklistHistory,
+    CoinTransaction,
+    GuildConfig,
+    Player,
+)
 from ..utils import BlacklistTabular
 
 if TYPE_CHECKING:
@@ -49,10 +56,25 @@ class BallInstanceTabular(TabularInlinePaginated):
         return format_html(f'<a href="{admin_url}">{guild}</a>')
 
 
+class CoinTransactionTabular(TabularInlinePaginated):
+    model = CoinTransaction
+    fk_name = "player"
+    per_page = 20
+    ordering = ("-date",)
+    fields = ("date", "reason", "amount", "balance")
+    readonly_fields = ("date", "reason", "amount", "balance")
+    classes = ("collapse",)
+    can_delete = False
+
+    # the ledger is append-only and written by the bot
+    def has_add_permission(self, request: "HttpRequest", obj: "Player") -> bool:
+        return False
+
+
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
     save_on_top = True
-    inlines = (BlacklistTabular, BallInstanceTabular)
+    inlines = (BlacklistTabular, BallInstanceTabular, CoinTransactionTabular)
 
     list_display = ("discord_id", "pk", "coins", "blacklisted")
     list_filter = (BlacklistedListFilter,)
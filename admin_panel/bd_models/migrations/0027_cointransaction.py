@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bd_models", "0026_ballinstance_deleted"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoinTransaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "amount",
+                    models.BigIntegerField(help_text="Coins added, negative if removed"),
+                ),
+                (
+                    "balance",
+                    models.BigIntegerField(help_text="Coins of the player after this transaction"),
+                ),
+                (
+                    "reason",
+                    models.SmallIntegerField(
+                        choices=[
+                            (0, "Other"),
+                            (1, "Catch"),
+                            (2, "Trade"),
+                            (3, "Battle"),
+                            (4, "Pack"),
+                            (5, "Donation"),
+                            (6, "Admin"),
+                        ],
+                        default=0,
+                        help_text="What the coins were changed for",
+                    ),
+                ),
+                ("date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "player",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coin_transactions",
+                        to="bd_models.player",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "cointransaction",
+                "managed": True,
+            },
+        ),
+    ]
@@ -69,6 +69,16 @@ class TradeCooldownPolicy(models.IntegerChoices):
     BYPASS = 2
 
 
+class CoinTransactionReason(models.IntegerChoices):
+    OTHER = 0
+    CATCH = 1
+    TRADE = 2
+    BATTLE = 3
+    PACK = 4
+    DONATION = 5
+    ADMIN = 6
+
+
 class BallSeasons(models.IntegerChoices):
     F12024 = 1, "F1 2024"
     CHAMPS = 2, "Champions"
@@ -475,6 +485,26 @@ class TradeObject(models.Model):
         db_table = "tradeobject"
 
 
+class CoinTransaction(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="coin_transactions")
+    player_id: int
+    amount = models.BigIntegerField(help_text="Coins added, negative if removed")
+    balance = models.BigIntegerField(help_text="Coins of the player after this transaction")
+    reason = models.SmallIntegerField(
+        choices=CoinTransactionReason.choices,
+        help_text="What the coins were changed for",
+        default=CoinTransactionReason.OTHER,
+    )
+    date = models.DateTimeField(auto_now_add=True, editable=False)
+
+    def __str__(self) -> str:
+        return f"Coin transaction #{self.pk:0X}"
+
+    class Meta:
+        managed = True
+        db_table = "cointransaction"
+
+
 class Friendship(models.Model):
     since = models.DateTimeField(auto_now_add=True, editable=False)
     player1 = models.ForeignKey(Player, on_delete=models.CASCADE)
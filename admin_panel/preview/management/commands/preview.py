@@ -5,7 +5,7 @@ import sys
 from django.core.management.base import BaseCommand, CommandError, CommandParser
 from tortoise.exceptions import DoesNotExist
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.image_generator.image_gen import PROFILES, draw_card
 from ballsdex.core.models import Ball, BallInstance, Special
 from ballsdex.settings import settings
 
@@ -28,6 +28,12 @@ class Command(BaseCommand):
             "--special",
             help="The special event's background you want to use, otherwise regime is used",
         )
+        parser.add_argument(
+            "--profile",
+            choices=PROFILES.keys(),
+            default="full",
+            help="The output size and encoding settings of the card",
+        )
 
     async def generate_preview(self, *args, **options):
         await refresh_cache()
@@ -59,7 +65,9 @@ class Command(BaseCommand):
         )
 
         instance = BallInstance(ball=ball, special=special)
-        image, kwargs = draw_card(instance, media_path="./media/")
+        image, kwargs = draw_card(
+            instance, media_path="./media/", profile=PROFILES[options["profile"]]
+        )
 
         if sys.platform not in ("win32", "darwin") and not os.environ.get("DISPLAY"):
             self.stderr.write(
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from tortoise.exceptions import DoesNotExist
+
+from ballsdex.core.image_generator.cache import CardCache
+from ballsdex.core.image_generator.image_gen import PROFILES, CardProfile, CardSpec
+from ballsdex.core.image_generator.renderer import CardRenderer
+from ballsdex.core.models import Ball, BallInstance, Player, Special, balls, specials
+from ballsdex.settings import settings
+
+from ...utils import refresh_cache
+
+MEDIA_PATH = "./media/"
+CHUNK_SIZE = 1000
+# no interaction deadline here, only guard against a stuck worker
+RENDER_TIMEOUT = 600
+
+
+class Command(BaseCommand):
+    help = (
+        "Render cards in bulk using all CPU cores, either into the bot's card cache or into "
+        "a directory. Cards that were already rendered are skipped, so this can be interrupted "
+        "and resumed. By default, every combination of "
+        f"{settings.collectible_name} and special is rendered."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            "--instances",
+            action="store_true",
+            help=f"Render existing {settings.plural_collectible_name} instead of combinations",
+        )
+        parser.add_argument(
+            "--ball", help=f"Only render cards of the {settings.collectible_name} with this name"
+        )
+        parser.add_argument("--special", help="Only render cards with the special of this name")
+        parser.add_argument(
+            "--player",
+            type=int,
+            help="Only render cards owned by the player with this Discord ID, implies --instances",
+        )
+        parser.add_argument(
+            "--profile",
+            action="append",
+            choices=PROFILES.keys(),
+            help='Output profile to render, can be repeated. Defaults to "full"',
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Write the cards in this directory instead of the card cache",
+        )
+        parser.add_argument(
+            "--cache-directory",
+            type=Path,
+            help="Card cache directory, defaults to the one in config.yml. "
+            "Relative paths are resolved from the bot's directory.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Number of rendering processes"
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Render cards again even if they already exist, useful for benchmarking",
+        )
+
+    async def iter_combinations(
+        self, ball: Ball | None, special: Special | None
+    ) -> AsyncIterator[tuple[str, BallInstance]]:
+        ball_list = [ball] if ball else list(balls.values())
+        special_list = [special] if special else [None, *specials.values()]
+        for b in ball_list:
+            for s in special_list:
+                yield f"{b.pk}-{s.pk if s else 0}", BallInstance(ball=b, special=s)
+
+    async def iter_instances(
+        self, ball: Ball | None, special: Special | None, player: Player | None
+    ) -> AsyncIterator[tuple[str, BallInstance]]:
+        filters = {}
+        if ball:
+            filters["ball"] = ball
+        if special:
+            filters["special"] = special
+        if player:
+            filters["player"] = player
+        last_id = 0
+        while True:
+            chunk = (
+                await BallInstance.filter(deleted=False, id__gt=last_id, **filters)
+                .order_by("id")
+                .limit(CHUNK_SIZE)
+            )
+            if not chunk:
+                return
+            for instance in chunk:
+                yield f"{instance.pk:0X}", instance
+            last_id = chunk[-1].pk
+
+    async def count(
+        self, ball: Ball | None, special: Special | None, player: Player | None, instances: bool
+    ) -> int:
+        if not instances:
+            return (1 if ball else len(balls)) * (1 if special else len(specials) + 1)
+        filters = {}
+        if ball:
+            filters["ball"] = ball
+        if special:
+            filters["special"] = special
+        if player:
+            filters["player"] = player
+        return await BallInstance.filter(deleted=False, **filters).count()
+
+    async def render_cards(self, *args, **options):
+        await refresh_cache()
+
+        ball: Ball | None = None
+        if ball_name := options.get("ball"):
+            try:
+                ball = await Ball.get(country__iexact=ball_name)
+            except DoesNotExist as e:
+                raise CommandError(
+                    f'No {settings.collectible_name} found with the name "{ball_name}"'
+                ) from e
+        special: Special | None = None
+        if special_name := options.get("special"):
+            try:
+                special = await Special.get(name__iexact=special_name)
+            except DoesNotExist as e:
+                raise CommandError(f'No special found with the name "{special_name}"') from e
+        player: Player | None = None
+        if player_id := options.get("player"):
+            try:
+                player = await Player.get(discord_id=player_id)
+            except DoesNotExist as e:
+                raise CommandError(f"No player found with the ID {player_id}") from e
+        instances = options["instances"] or player is not None
+        profiles = [PROFILES[x] for x in options.get("profile") or ("full",)]
+        force: bool = options["force"]
+
+        output: Path | None = options.get("output")
+        cache: CardCache | None = None
+        if output:
+            output.mkdir(parents=True, exist_ok=True)
+        else:
+            cache_directory: Path | None = options.get("cache_directory")
+            if cache_directory is None and settings.render_cache_directory:
+                cache_directory = Path(settings.render_cache_directory)
+            if cache_directory is None:
+                raise CommandError(
+                    "No card cache directory configured, use --cache-directory or --output."
+                )
+            if not cache_directory.is_absolute():
+                cache_directory = Path("..") / cache_directory
+            # the memory tier is useless here
+            cache = CardCache(cache_directory, max_memory=0)
+
+        workers: int = options["workers"]
+        renderer = CardRenderer(
+            MEDIA_PATH, workers=workers, max_queue=workers * 2, timeout=RENDER_TIMEOUT
+        )
+        total = await self.count(ball, special, player, instances) * len(profiles)
+        rendered = 0
+        skipped = 0
+        failed = 0
+
+        async def render(name: str, spec: CardSpec, profile: CardProfile):
+            nonlocal rendered, skipped
+            if cache is not None:
+                key = CardCache.key(spec, profile)
+                if not force and key in cache:
+                    skipped += 1
+                    return
+                await cache.set(key, await renderer.render_spec(spec, profile))
+            else:
+                assert output
+                file = output / f"{name}-{profile.name}.{profile.extension}"
+                if not force and file.exists():
+                    skipped += 1
+                    return
+                data = await renderer.render_spec(spec, profile)
+                await asyncio.to_thread(file.write_bytes, data)
+            rendered += 1
+
+        async def process(name: str, spec: CardSpec, profile: CardProfile):
+            # one bad card (a missing asset for instance) must not abort the whole run
+            nonlocal failed
+            try:
+                await render(name, spec, profile)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(
+                    self.style.ERROR(f"Failed to render card {name} ({profile.name}): {e!r}")
+                )
+
+        start = time.perf_counter()
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(5)
+                elapsed = time.perf_counter() - start
+                self.stderr.write(
+                    f"{rendered + skipped + failed}/{total} cards ({skipped} skipped, "
+                    f"{failed} failed), "
+                    f"{rendered / elapsed:.2f} cards/s"
+                )
+
+        self.stderr.write(
+            self.style.SUCCESS(f"Rendering {total} cards with {workers} processes...")
+        )
+        iterator = (
+            self.iter_instances(ball, special, player)
+            if instances
+            else self.iter_combinations(ball, special)
+        )
+        progress_task = asyncio.create_task(report_progress())
+        try:
+            batch: list[tuple[str, CardSpec]] = []
+            async for name, instance in iterator:
+                try:
+                    batch.append((name, CardSpec.from_instance(instance, MEDIA_PATH)))
+                except Exception as e:
+                    failed += len(profiles)
+                    self.stderr.write(self.style.ERROR(f"Failed to prepare card {name}: {e!r}"))
+                    continue
+                if len(batch) < CHUNK_SIZE:
+                    continue
+                await asyncio.gather(*(process(n, s, p) for n, s in batch for p in profiles))
+                batch.clear()
+            await asyncio.gather(*(process(n, s, p) for n, s in batch for p in profiles))
+        finally:
+            progress_task.cancel()
+            renderer.close()
+
+        elapsed = time.perf_counter() - start
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Rendered {rendered} cards in {elapsed:.1f}s ({rendered / elapsed:.2f} cards/s), "
+                f"{skipped} skipped."
+            )
+        )
+        if failed:
+            self.stderr.write(self.style.ERROR(f"{failed} cards failed to render."))
+
+    def handle(self, *args, **options):
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(self.render_cards(*args, **options))
@@ -3,6 +3,7 @@ import os
 from tortoise import Tortoise
 
 from ballsdex.__main__ import init_tortoise
+from ballsdex.core.image_generator.renderer import CardRenderer
 from ballsdex.core.models import (
     Ball,
     Economy,
@@ -14,6 +15,8 @@ from ballsdex.core.models import (
     specials,
 )
 
+renderer = CardRenderer(media_path="./media/")
+
 
 async def refresh_cache():
     """
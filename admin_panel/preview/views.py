@@ -1,10 +1,20 @@
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.image_generator.image_gen import PROFILES, CardProfile
 from ballsdex.core.models import Ball, BallInstance, Special
 
-from .utils import refresh_cache
+from .utils import refresh_cache, renderer
+
+
+def negotiate_profile(request: HttpRequest) -> CardProfile:
+    """
+    Full resolution card, in WEBP if the browser advertises support for it, PNG otherwise.
+    """
+    profile = PROFILES["full"]
+    if "image/webp" in request.headers.get("Accept", ""):
+        return profile
+    return profile.with_format("PNG")
 
 
 async def render_ballinstance(request: HttpRequest, ball_pk: int) -> HttpResponse:
@@ -12,11 +22,8 @@ async def render_ballinstance(request: HttpRequest, ball_pk: int) -> HttpRespons
 
     ball = await Ball.get(pk=ball_pk)
     instance = BallInstance(ball=ball)
-    image, kwargs = draw_card(instance, media_path="./media/")
-
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    profile = negotiate_profile(request)
+    return HttpResponse(await renderer.render(instance, profile), content_type=profile.mime_type)
 
 
 async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
@@ -32,8 +39,5 @@ async def render_special(request: HttpRequest, special_pk: int) -> HttpResponse:
 
     special = await Special.get(pk=special_pk)
     instance = BallInstance(ball=ball, special=special)
-    image, kwargs = draw_card(instance, media_path="./media/")
-
-    response = HttpResponse(content_type="image/png")
-    image.save(response, **kwargs)  # type: ignore
-    return response
+    profile = negotiate_profile(request)
+    return HttpResponse(await renderer.render(instance, profile), content_type=profile.mime_type)
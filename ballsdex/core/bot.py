@@ -7,6 +7,7 @@ import math
 import time
 import types
 from datetime import datetime
+from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
 import aiohttp
@@ -24,7 +25,11 @@ from rich.console import Console
 from rich.table import Table
 
 from ballsdex.core.commands import Core
+from ballsdex.core.counters import player_counters
 from ballsdex.core.dev import Dev
+from ballsdex.core.image_generator.cache import CardCache
+from ballsdex.core.image_generator.image_gen import PROFILES
+from ballsdex.core.image_generator.renderer import CardRenderer
 from ballsdex.core.metrics import PrometheusServer
 from ballsdex.core.models import (
     Ball,
@@ -40,6 +45,8 @@ from ballsdex.core.models import (
     specials,
 )
 from ballsdex.core.utils.accept_tos import UserAcceptTOS, activation_embed
+from ballsdex.core.utils.names import catch_name_index
+from ballsdex.core.utils.utils import build_collectible_samplers, special_schedule
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -178,6 +185,20 @@ class BallsDexBot(commands.AutoShardedBot):
         self.catch_log: set[int] = set()
         self.command_log: set[int] = set()
         self.locked_balls = TTLCache(maxsize=99999, ttl=60 * 30)
+        self.card_renderer = CardRenderer(
+            workers=settings.render_workers,
+            max_queue=settings.render_max_queue,
+            timeout=settings.render_timeout,
+            cache=CardCache(
+                Path(settings.render_cache_directory) if settings.render_cache_directory else None,
+                max_memory=settings.render_cache_memory * 1024 * 1024,
+            ),
+            layers_memory=settings.render_layers_memory * 1024 * 1024,
+            assets_memory=settings.render_assets_memory * 1024 * 1024,
+            prerender_profiles=(
+                (PROFILES["full"], PROFILES["standard"]) if settings.render_prerender else ()
+            ),
+        )
 
         self.owner_ids: set
 
@@ -220,6 +241,8 @@ class BallsDexBot(commands.AutoShardedBot):
         for ball in await Ball.all():
             balls[ball.pk] = ball
         table.add_row(settings.collectible_name.title() + "s", str(len(balls)))
+        build_collectible_samplers()
+        catch_name_index.rebuild(balls.values())
 
         regimes.clear()
         for regime in await Regime.all():
@@ -234,8 +257,20 @@ class BallsDexBot(commands.AutoShardedBot):
         specials.clear()
         for special in await Special.all():
             specials[special.pk] = special
+        special_schedule.rebuild(specials.values())
         table.add_row("Special events", str(len(specials)))
 
+        backgrounds = [x.background for x in regimes.values()]
+        backgrounds.extend(x.background for x in specials.values() if x.background)
+        overlays = {x.overlay for x in balls.values() if x.overlay}
+        overlays.update(x.overlay for x in specials.values() if x.overlay)
+        await self.card_renderer.warm_up(
+            backgrounds, [x.icon for x in economies.values()], list(overlays)
+        )
+        table.add_row(
+            "Preloaded card assets", str(len(backgrounds) + len(economies) + len(overlays))
+        )
+
         self.blacklist = set()
         for blacklisted_id in await BlacklistedID.all().only("discord_id"):
             self.blacklist.add(blacklisted_id.discord_id)
@@ -250,6 +285,13 @@ class BallsDexBot(commands.AutoShardedBot):
         console = Console()
         console.print(table)
 
+    async def close(self) -> None:
+        # write the buffered counters first, while the database is still connected and before
+        # the rest of the shutdown uses up the time given to close
+        await player_counters.stop()
+        await super().close()
+        self.card_renderer.close()
+
     async def gateway_healthy(self) -> bool:
         """Check whether or not the gateway proxy is ready and healthy."""
         if settings.gateway_url is None:
@@ -311,6 +353,8 @@ class BallsDexBot(commands.AutoShardedBot):
             )
 
         await self.load_cache()
+        if settings.counters_flush_interval:
+            player_counters.start(settings.counters_flush_interval / 1000)
         grammar = "" if len(self.blacklist) == 1 else "s"
         if self.blacklist:
             log.info(f"{len(self.blacklist)} blacklisted user{grammar}.")
@@ -0,0 +1,224 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING, Iterable
+
+from tortoise import Tortoise
+
+from ballsdex.core.metrics import counters_backlog, counters_flush_time
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import CoinTransactionReason, Player
+
+log = logging.getLogger("ballsdex.core.counters")
+
+COUNTERS = ("coins", "trades_today", "battles_today")
+
+# Add the buffered deltas to the counters of the players, and record the coins in the ledger.
+# The balance of each transaction is computed backwards from the new balance of the player,
+# in the order the transactions were buffered.
+FLUSH_QUERY = """
+WITH changes (player_id, coins, trades_today, battles_today) AS (
+    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::int[], $4::int[])
+), updated AS (
+    UPDATE player SET
+        coins = player.coins + changes.coins,
+        trades_today = player.trades_today + changes.trades_today,
+        battles_today = player.battles_today + changes.battles_today
+    FROM changes
+    WHERE player.id = changes.player_id
+    RETURNING player.id, player.coins
+), transactions (player_id, amount, reason, position) AS (
+    SELECT * FROM unnest($5::bigint[], $6::bigint[], $7::smallint[]) WITH ORDINALITY
+), ledger AS (
+    INSERT INTO cointransaction (player_id, amount, balance, reason, date)
+    SELECT
+        transactions.player_id,
+        transactions.amount,
+        updated.coins - COALESCE(
+            SUM(transactions.amount) OVER (
+                PARTITION BY transactions.player_id ORDER BY transactions.position
+                ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+            ),
+            0
+        ),
+        transactions.reason,
+        now()
+    FROM transactions
+    JOIN updated ON updated.id = transactions.player_id
+    ORDER BY transactions.player_id, transactions.position
+)
+SELECT id FROM updated
+"""
+
+
+class PlayerCounters:
+    """
+    Write-behind buffer of the counters of players (coins, trades and battles of the day).
+
+    Deltas are merged per player in memory, then written every few milliseconds in a single
+    statement, instead of updating the row of the player for every reward. Only additions can
+    be buffered, removing coins requires checking the balance and is done immediately by
+    `CoinTransaction.apply`, which flushes the pending deltas of its players first.
+
+    Until flushed, the deltas are missing from the database: use `merge` on players fetched
+    from the database to read their actual counters.
+    """
+
+    def __init__(self):
+        self.counters: dict[int, list[int]] = {}
+        self.transactions: dict[tuple[int, int], int] = {}
+        self.interval: float = 0
+        self.task: asyncio.Task | None = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.task is not None
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+    def start(self, interval: float):
+        """
+        Start flushing the buffer periodically. Until then, nothing is buffered.
+
+        Parameters
+        ----------
+        interval: float
+            Number of seconds between each flush.
+        """
+        if self.task is not None:
+            return
+        self.interval = interval
+        self.task = asyncio.create_task(self._flush_loop())
+        log.info(f"Buffering player counters, flushed every {interval * 1000:.0f}ms")
+
+    async def stop(self):
+        """
+        Stop the periodic flushes and write the remaining deltas. Additions made afterwards are
+        written immediately.
+        """
+        if self.task is None:
+            return
+        task, self.task = self.task, None
+        # with the lock held, the loop can only be sleeping or waiting for the lock, never
+        # cancelled in the middle of a flush with the deltas already taken out of the buffer
+        async with self.lock:
+            task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Failed to flush player counters, retrying later")
+
+    async def add(
+        self,
+        player_id: int,
+        *,
+        coins: int = 0,
+        reason: "CoinTransactionReason | None" = None,
+        trades_today: int = 0,
+        battles_today: int = 0,
+    ):
+        """
+        Buffer additions to the counters of a player, or write them immediately if the buffer
+        is not enabled (or was stopped meanwhile). Loaded `Player` objects are left untouched,
+        it is up to the caller to update the ones it keeps.
+
+        Raises
+        ------
+        ValueError
+            A delta is negative.
+        """
+        deltas = (coins, trades_today, battles_today)
+        if any(x < 0 for x in deltas):
+            raise ValueError("Only additions can be buffered")
+        if not any(deltas):
+            return
+        key = (player_id, reason.value if reason is not None else 0)
+        if not self.enabled:
+            await self._write({player_id: list(deltas)}, {key: coins} if coins else {})
+            return
+
+        counters = self.counters.setdefault(player_id, [0, 0, 0])
+        for i, delta in enumerate(deltas):
+            counters[i] += delta
+        if coins:
+            self.transactions[key] = self.transactions.get(key, 0) + coins
+        counters_backlog.set(len(self.counters))
+
+    def merge(self, player: "Player") -> "Player":
+        """
+        Add the pending deltas to a player freshly fetched from the database, so that it
+        reflects the changes not written yet.
+        """
+        if counters := self.counters.get(player.pk):
+            for name, delta in zip(COUNTERS, counters):
+                setattr(player, name, getattr(player, name) + delta)
+        return player
+
+    async def flush(self, players: "Iterable[Player] | None" = None):
+        """
+        Write the pending deltas to the database.
+
+        Parameters
+        ----------
+        players: Iterable[Player] | None
+            Only write the deltas of these players. Defaults to all of them.
+        """
+        async with self.lock:
+            if players is None:
+                counters, self.counters = self.counters, {}
+                transactions, self.transactions = self.transactions, {}
+            else:
+                counters = {}
+                for player in players:
+                    if player.pk in self.counters:
+                        counters[player.pk] = self.counters.pop(player.pk)
+                transactions = {}
+                for key in [x for x in self.transactions if x[0] in counters]:
+                    transactions[key] = self.transactions.pop(key)
+            if not counters:
+                return
+
+            start = time.perf_counter()
+            try:
+                await self._write(counters, transactions)
+            except Exception:
+                # put them back in front of the deltas buffered meanwhile
+                for pk, deltas in self.counters.items():
+                    pending = counters.setdefault(pk, [0, 0, 0])
+                    for i, delta in enumerate(deltas):
+                        pending[i] += delta
+                for key, amount in self.transactions.items():
+                    transactions[key] = transactions.get(key, 0) + amount
+                self.counters, self.transactions = counters, transactions
+                raise
+            finally:
+                counters_flush_time.observe(time.perf_counter() - start)
+                counters_backlog.set(len(self.counters))
+
+    async def _write(
+        self, counters: dict[int, list[int]], transactions: dict[tuple[int, int], int]
+    ):
+        await Tortoise.get_connection("default").execute_query(
+            FLUSH_QUERY,
+            [
+                list(counters.keys()),
+                *(list(x) for x in zip(*counters.values())),
+                [x[0] for x in transactions],
+                list(transactions.values()),
+                [x[1] for x in transactions],
+            ],
+        )
+
+
+player_counters = PlayerCounters()
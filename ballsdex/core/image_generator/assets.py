@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from cachetools import LRUCache
+from PIL import Image, ImageOps
+
+log = logging.getLogger("ballsdex.core.image_generator.assets")
+
+
+@dataclass
+class AssetCacheStats:
+    pid: int
+    hits: int
+    misses: int
+    memory: int
+    entries: int
+
+
+class AssetCache:
+    """
+    Cache of decoded images used by the card generation, already converted to RGBA and
+    resized when needed.
+
+    Entries are keyed by path and modification time, so replaced files are decoded again.
+    The size of the cache is accounted in bytes of decoded pixels.
+
+    The returned images are shared, they must be copied before being modified.
+
+    Parameters
+    ----------
+    max_memory: int
+        Maximum size of the decoded images kept, in bytes.
+    """
+
+    def __init__(self, max_memory: int = 256 * 1024 * 1024):
+        self.images: LRUCache[tuple, Image.Image] = LRUCache(
+            maxsize=max_memory, getsizeof=lambda x: len(x.getbands()) * x.width * x.height
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, path: str, size: tuple[int, int] | None = None, *, fit: bool = False
+    ) -> Image.Image:
+        """
+        Return the decoded image at the given path.
+
+        Parameters
+        ----------
+        path: str
+            Path to the image file.
+        size: tuple[int, int] | None
+            If provided, the image is resized to those dimensions.
+        fit: bool
+            Crop the image to keep its aspect ratio when resizing, see `ImageOps.fit`.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        key = (path, mtime, size, fit)
+        try:
+            image = self.images[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        if size is None:
+            with Image.open(path) as file:
+                image = file.convert("RGBA")
+        else:
+            source = self.get(path)
+            image = ImageOps.fit(source, size) if fit else source.resize(size)
+        try:
+            self.images[key] = image
+        except ValueError:  # larger than the whole cache
+            pass
+        return image
+
+    def preload(self, paths: list[str], size: tuple[int, int] | None = None, *, fit: bool = False):
+        for path in paths:
+            try:
+                self.get(path, size, fit=fit)
+            except OSError:
+                log.warning(f"Could not preload asset {path}", exc_info=True)
+
+    def stats(self) -> AssetCacheStats:
+        return AssetCacheStats(
+            pid=os.getpid(),
+            hits=self.hits,
+            misses=self.misses,
+            memory=int(self.images.currsize),
+            entries=len(self.images),
+        )
+
+
+class CreditsColorCache:
+    """
+    Colour of the credits text for each card background, which depends on its brightness.
+
+    Entries are keyed by a hash of the background's content, so a replaced background gets its
+    colour computed again. If a path is given, entries are persisted in a JSON file shared by
+    the rendering processes, so they survive restarts.
+
+    Parameters
+    ----------
+    path: Path | None
+        JSON file where the colours are stored. If `None`, they are only kept in memory.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.colors: dict[str, tuple[int, int, int, int]] = {}
+        self.hashes: dict[tuple[str, int, int], str] = {}
+        if path is not None:
+            self.colors.update(self._read())
+
+    def _read(self) -> dict[str, tuple[int, int, int, int]]:
+        assert self.path
+        try:
+            data = json.loads(self.path.read_text())
+            return {key: tuple(color) for key, color in data.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError):
+            log.warning(f"Could not read the credits colours from {self.path}", exc_info=True)
+            return {}
+
+    def _write(self):
+        assert self.path
+        # other processes may have added entries since the file was read
+        colors = {**self._read(), **self.colors}
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(colors))
+            os.replace(tmp, self.path)
+        except OSError:
+            log.warning(f"Could not write the credits colours to {self.path}", exc_info=True)
+
+    def content_hash(self, path: str) -> str:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path
+        # the file is only hashed again if it changed
+        fingerprint = (path, stat.st_mtime_ns, stat.st_size)
+        try:
+            return self.hashes[fingerprint]
+        except KeyError:
+            pass
+        with open(path, "rb") as file:
+            digest = hashlib.file_digest(file, "blake2b").hexdigest()
+        self.hashes[fingerprint] = digest
+        return digest
+
+    def get(self, background: str) -> tuple[int, int, int, int] | None:
+        return self.colors.get(self.content_hash(background))
+
+    def set(self, background: str, color: tuple[int, int, int, int]):
+        self.colors[self.content_hash(background)] = color
+        if self.path is not None:
+            self._write()
@@ -0,0 +1,323 @@
+"""
+Benchmark of the card generation, with regression checks against golden images.
+
+Cards are rendered from synthetic models using the bundled fonts and the sample assets of
+`admin_panel/media`, no database or configuration is needed. Run from the bot's directory:
+
+    python3 -m ballsdex.core.image_generator.benchmark
+
+For each output profile and format, this reports the latency of rendering and encoding a card,
+the size of the encoded file and the peak memory of the process. Each combination runs in a
+fresh process, so that the memory figures are not inflated by the previous ones.
+
+The full size cards are then compared pixel by pixel with the golden images stored next to
+this file, and the command exits with a non-zero status if any differs. When the output is
+changed on purpose, run again with `--update-golden` and commit the new images.
+"""
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TypeVar
+
+from PIL import Image, ImageChops
+from rich import box
+from rich.console import Console
+from rich.table import Table
+from tortoise import Tortoise
+from tortoise.models import Model
+
+from ballsdex.core.image_generator.image_gen import (
+    PROFILES,
+    CardProfile,
+    CardSpec,
+    render_card,
+    render_card_bytes,
+)
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+GOLDEN_PATH = Path(__file__).parent / "golden"
+MEDIA_PATH = "./admin_panel/media/"
+FORMATS = ("WEBP", "PNG")
+
+T = TypeVar("T", bound=Model)
+
+
+@dataclass
+class BenchmarkResult:
+    profile: str
+    format: str
+    first: float
+    latencies: list[float]
+    sizes: list[int]
+    peak_rss: int | None
+
+
+async def build_fixtures(media_path: str) -> dict[str, CardSpec]:
+    """
+    Build the card specifications of the benchmarked cases from unsaved models, covering the
+    different layers of a card: regimes, economies, specials, overlays and text wrapping.
+    """
+    # no query is made, but the relations of the models must be initialized
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["ballsdex.core.models"]})
+    try:
+        from ballsdex.core.models import Ball, BallInstance, Economy, Regime, Special
+
+        def fixture(model: type[T], **kwargs) -> T:
+            instance = model(**kwargs)
+            # allow relating other models to this one
+            instance._saved_in_db = True
+            return instance
+
+        democracy = fixture(Regime, id=1, name="Democracy", background="democracy.png")
+        dictatorship = fixture(Regime, id=2, name="Dictatorship", background="dictatorship.png")
+        capitalist = fixture(Economy, id=1, name="Capitalist", icon="capitalist.png")
+        shiny = fixture(
+            Special, id=1, name="Shiny", background="shiny.png", credits="Shiny artist"
+        )
+        union = fixture(Special, id=2, name="Union", background=None, overlay="union.png")
+
+        def ball(pk: int, **kwargs) -> Ball:
+            return fixture(
+                Ball,
+                **{
+                    "id": pk,
+                    "country": "Republic of Testland",
+                    "regime": democracy,
+                    "economy": capitalist,
+                    "health": 1500,
+                    "attack": 750,
+                    "rarity": 1,
+                    "emoji_id": 100000000000000000,
+                    "wild_card": "communist.png",
+                    "collection_card": "communist.png",
+                    "credits": "Ball artist",
+                    "capacity_name": "Sample capacity",
+                    "capacity_description": "Deals extra damage to every other ball.",
+                    **kwargs,
+                },
+            )
+
+        cases = {
+            "regime": BallInstance(ball=ball(1), special=None),
+            "special": BallInstance(
+                ball=ball(
+                    2,
+                    capacity_name="Capacity with a name long enough to be wrapped",
+                    capacity_description="A much longer description that will span several "
+                    "lines of the card, to make sure that the text wrapping is covered by the "
+                    "golden images as well.",
+                ),
+                special=shiny,
+                health_bonus=20,
+                attack_bonus=-20,
+            ),
+            "overlays": BallInstance(
+                ball=ball(
+                    3,
+                    country="Testland",
+                    short_name="Test",
+                    regime=dictatorship,
+                    economy=None,
+                    overlay="union.png",
+                    health=99999,
+                    attack=1,
+                ),
+                special=union,
+            ),
+        }
+        return {name: CardSpec.from_instance(x, media_path) for name, x in cases.items()}
+    finally:
+        await Tortoise.close_connections()
+
+
+def peak_rss() -> int | None:
+    """
+    Return the peak resident memory of the current process in bytes, if available.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_benchmark(specs: list[CardSpec], profile: CardProfile, iterations: int) -> BenchmarkResult:
+    """
+    Render and encode the given cards in turns. The first render, which includes loading the
+    assets, is measured separately, and every card is drawn once before measuring the others.
+    """
+    start = time.perf_counter()
+    render_card_bytes(specs[0], profile)
+    first = time.perf_counter() - start
+    for spec in specs[1:]:
+        render_card_bytes(spec, profile)
+
+    latencies: list[float] = []
+    sizes: list[int] = []
+    for i in range(iterations):
+        spec = specs[i % len(specs)]
+        # change the stats, like different instances of the same ball
+        spec = replace(spec, health=spec.health + i, attack=spec.attack + i)
+        start = time.perf_counter()
+        data = render_card_bytes(spec, profile)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(data))
+    return BenchmarkResult(
+        profile.name, profile.format, first, latencies, sizes, peak_rss=peak_rss()
+    )
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def check_golden(
+    specs: dict[str, CardSpec], *, update: bool, output: Path | None
+) -> dict[str, str | None]:
+    """
+    Compare the full size renders with the golden images.
+
+    Returns
+    -------
+    dict[str, str | None]
+        The differences found for each case, `None` if the images are identical.
+    """
+    results: dict[str, str | None] = {}
+    GOLDEN_PATH.mkdir(exist_ok=True)
+    for name, spec in specs.items():
+        image, _ = render_card(spec, PROFILES["full"])
+        golden_file = GOLDEN_PATH / f"{name}.webp"
+        if update:
+            # lossless WEBP is much smaller than PNG, "exact" keeps transparent pixels intact
+            image.save(golden_file, lossless=True, quality=100, method=6, exact=True)
+            results[name] = None
+            continue
+        if not golden_file.exists():
+            results[name] = "no golden image, run with --update-golden"
+            continue
+        with Image.open(golden_file) as file:
+            golden = file.convert("RGBA")
+        if golden.size != image.size:
+            results[name] = f"size is {image.size}, expected {golden.size}"
+        elif golden.tobytes() == image.tobytes():
+            results[name] = None
+            continue
+        else:
+            # largest difference of any channel, for each pixel
+            difference = functools.reduce(
+                ImageChops.lighter, ImageChops.difference(image, golden).split()
+            )
+            histogram = difference.histogram()
+            results[name] = (
+                f"{sum(histogram[1:])} pixels differ (max channel difference "
+                f"{difference.getextrema()[1]}) within {difference.getbbox()}"
+            )
+        if output:
+            output.mkdir(parents=True, exist_ok=True)
+            image.save(output / f"{name}.png")
+    return results
+
+
+def parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python3 -m ballsdex.core.image_generator.benchmark",
+        description="Benchmark the card generation and check its output against golden images.",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=50, help="Number of cards rendered per combination"
+    )
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=PROFILES.keys(),
+        help="Only benchmark this output profile, can be repeated",
+    )
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=FORMATS,
+        type=str.upper,
+        help="Only benchmark this encoding format, can be repeated",
+    )
+    parser.add_argument(
+        "--skip-benchmark", action="store_true", help="Only check the golden images"
+    )
+    parser.add_argument(
+        "--update-golden",
+        action="store_true",
+        help="Replace the golden images with the current output",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Write the renders differing from the golden images here"
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments: list[str]) -> int:
+    args = parse_arguments(arguments)
+    console = Console()
+    specs = asyncio.run(build_fixtures(MEDIA_PATH))
+
+    if not args.skip_benchmark:
+        table = Table(box=box.SIMPLE, title=f"Card generation ({args.iterations} iterations)")
+        table.add_column("Profile", style="cyan")
+        table.add_column("Format", style="cyan")
+        table.add_column("First (ms)", justify="right")
+        table.add_column("p50 (ms)", justify="right", style="green")
+        table.add_column("p99 (ms)", justify="right", style="green")
+        table.add_column("Size (KiB)", justify="right")
+        table.add_column("Peak RSS (MiB)", justify="right")
+
+        context = multiprocessing.get_context("spawn")
+        for profile_name in args.profile or PROFILES.keys():
+            for format in args.format or FORMATS:
+                profile = PROFILES[profile_name].with_format(format)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(
+                        run_benchmark, list(specs.values()), profile, args.iterations
+                    ).result()
+                table.add_row(
+                    result.profile,
+                    result.format,
+                    f"{result.first * 1000:.1f}",
+                    f"{percentile(result.latencies, 50) * 1000:.1f}",
+                    f"{percentile(result.latencies, 99) * 1000:.1f}",
+                    f"{statistics.mean(result.sizes) / 1024:.1f}",
+                    f"{result.peak_rss / 1024 / 1024:.1f}" if result.peak_rss else "-",
+                )
+        console.print(table)
+
+    failed = False
+    table = Table(box=box.SIMPLE, title="Golden images")
+    table.add_column("Case", style="cyan")
+    table.add_column("Result")
+    for name, difference in check_golden(
+        specs, update=args.update_golden, output=args.output
+    ).items():
+        if args.update_golden:
+            table.add_row(name, "[yellow]updated")
+        elif difference is None:
+            table.add_row(name, "[green]identical")
+        else:
+            failed = True
+            table.add_row(name, f"[red]{difference}")
+    console.print(table)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from cachetools import LRUCache
+
+from ballsdex.core.image_generator.image_gen import CardSpec, asset_fingerprint
+from ballsdex.core.metrics import card_cache_hits, card_cache_misses
+
+log = logging.getLogger("ballsdex.core.image_generator.cache")
+
+# bump this when the output of the card generation changes to invalidate existing entries
+CACHE_VERSION = 2
+
+
+class CardCache:
+    """
+    Content-addressed cache of rendered cards.
+
+    Entries are keyed by a hash of everything that influences the output of the card
+    generation: the `CardSpec` (which derives from the `Ball`, `Special` and `BallInstance`
+    rows) and the fingerprint of every asset file used. Editing a model or replacing a file
+    produces a new key, so stale entries are never served, they just age out.
+
+    There are two tiers: an in-memory LRU of the encoded bytes, and an optional on-disk store
+    that survives restarts.
+
+    Parameters
+    ----------
+    path: Path | None
+        Directory of the on-disk store. If `None`, only the memory tier is used.
+    max_memory: int
+        Maximum size in bytes of the memory tier.
+    """
+
+    def __init__(self, path: Path | None = None, *, max_memory: int = 256 * 1024 * 1024):
+        self.path = path
+        self.memory: LRUCache[str, bytes] = LRUCache(maxsize=max_memory, getsizeof=len)
+        if path is not None:
+            path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(spec: CardSpec, *extra: object) -> str:
+        """
+        Compute the cache key of a card.
+
+        Parameters
+        ----------
+        spec: CardSpec
+            The inputs of the card generation.
+        *extra: object
+            Additional values influencing the output, such as encoding options.
+        """
+        assets = [spec.background, spec.artwork, *spec.overlays]
+        if spec.economy_icon:
+            assets.append(spec.economy_icon)
+        # the bot and the admin panel use different relative media paths
+        spec = dataclasses.replace(
+            spec,
+            background=os.path.realpath(spec.background),
+            artwork=os.path.realpath(spec.artwork),
+            economy_icon=os.path.realpath(spec.economy_icon) if spec.economy_icon else None,
+            overlays=tuple(os.path.realpath(x) for x in spec.overlays),
+        )
+        payload = repr(
+            (
+                CACHE_VERSION,
+                dataclasses.astuple(spec),
+                tuple(asset_fingerprint(x)[1:] for x in assets),
+                extra,
+            )
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        assert self.path
+        return self.path / key[:2] / key
+
+    def _read(self, key: str) -> bytes | None:
+        try:
+            return self._file(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, data: bytes):
+        file = self._file(key)
+        file.parent.mkdir(exist_ok=True)
+        # write then rename, so that readers never see a partial file
+        tmp = file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, file)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.memory or (self.path is not None and self._file(key).exists())
+
+    async def get(self, key: str) -> bytes | None:
+        if (data := self.memory.get(key)) is not None:
+            card_cache_hits.labels(tier="memory").inc()
+            return data
+        if self.path is not None:
+            data = await asyncio.to_thread(self._read, key)
+            if data is not None:
+                card_cache_hits.labels(tier="disk").inc()
+                self.memory[key] = data
+                return data
+        card_cache_misses.inc()
+        return None
+
+    async def set(self, key: str, data: bytes):
+        try:
+            self.memory[key] = data
+        except ValueError:  # bigger than the whole memory tier
+            pass
+        if self.path is not None:
+            try:
+                await asyncio.to_thread(self._write, key, data)
+            except OSError:
+                log.warning("Failed to write card to the disk cache", exc_info=True)
@@ -1,9 +1,15 @@
+import functools
 import os
 import textwrap
+from dataclasses import dataclass, replace
+from io import BytesIO
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from cachetools import LRUCache
+from PIL import Image, ImageDraw, ImageFont, ImageStat
+
+from ballsdex.core.image_generator.assets import AssetCache, AssetCacheStats, CreditsColorCache
 
 if TYPE_CHECKING:
     from ballsdex.core.models import BallInstance
@@ -17,7 +23,7 @@ RECTANGLE_WIDTH = WIDTH - 40
 RECTANGLE_HEIGHT = (HEIGHT // 5) * 2
 
 CORNERS = ((34, 261), (1393, 992))
-artwork_size = [b - a for a, b in zip(*CORNERS)]
+artwork_size = cast(tuple[int, int], tuple(b - a for a, b in zip(*CORNERS)))
 
 # ===== TIP =====
 #
@@ -37,122 +43,411 @@ capacity_description_font = ImageFont.truetype(str(SOURCES_PATH / "OpenSans-Semi
 stats_font = ImageFont.truetype(str(SOURCES_PATH / "Bobby Jones Soft.otf"), 130)
 credits_font = ImageFont.truetype(str(SOURCES_PATH / "arial.ttf"), 40)
 
-credits_color_cache = {}
+
+@functools.lru_cache(maxsize=1024)
+def wrap_text(text: str, width: int) -> tuple[str, ...]:
+    return tuple(textwrap.wrap(text, width=width))
 
 
-def get_credit_color(image: Image.Image, region: tuple) -> tuple:
-    image = image.crop(region)
-    brightness = sum(image.convert("L").getdata()) / image.width / image.height  # type: ignore
+def get_credit_color(image: Image.Image, region: tuple) -> tuple[int, int, int, int]:
+    brightness = ImageStat.Stat(image.crop(region).convert("L")).mean[0]
     return (0, 0, 0, 255) if brightness > 100 else (255, 255, 255, 255)
 
 
+@dataclass(frozen=True)
+class CardSpec:
+    """
+    All the inputs needed to generate a card, detached from the database models so that it can
+    be sent to other processes.
+
+    Use `CardSpec.from_instance` to build one from a `BallInstance`.
+    """
+
+    title: str
+    background: str
+    artwork: str
+    economy_icon: str | None
+    capacity_name: str
+    capacity_description: str
+    health: int
+    attack: int
+    credits: str
+    card_name: str
+    overlays: tuple[str, ...] = ()
+
+    @classmethod
+    def from_instance(
+        cls, ball_instance: "BallInstance", media_path: str = "./admin_panel/media/"
+    ) -> "CardSpec":
+        ball = ball_instance.countryball
+        ball_credits = ball.credits
+        card_name = ball.cached_regime.name
+        if special_image := ball_instance.special_card:
+            card_name = getattr(ball_instance.specialcard, "name", card_name)
+            background = media_path + special_image
+            if ball_instance.specialcard and ball_instance.specialcard.credits:
+                ball_credits += f" • {ball_instance.specialcard.credits}"
+        else:
+            background = media_path + ball.cached_regime.background
+
+        overlays: list[str] = []
+        if ball.overlay:
+            overlays.append(media_path + ball.overlay)
+        if ball_instance.specialcard and getattr(ball_instance.specialcard, "overlay", None):
+            overlays.append(media_path + ball_instance.specialcard.overlay)
+
+        return cls(
+            title=ball.short_name or ball.country,
+            background=background,
+            artwork=media_path + ball.collection_card,
+            economy_icon=media_path + ball.cached_economy.icon if ball.cached_economy else None,
+            capacity_name=ball.capacity_name,
+            capacity_description=ball.capacity_description,
+            health=ball_instance.health,
+            attack=ball_instance.attack,
+            credits=ball_credits,
+            card_name=card_name,
+            overlays=tuple(overlays),
+        )
+
+
+@dataclass(frozen=True)
+class CardProfile:
+    """
+    Output settings of a rendered card.
+
+    Attributes
+    ----------
+    name: str
+        Name of the profile.
+    height: int | None
+        Height the card is resized to, keeping the aspect ratio. `None` keeps the original size.
+    format: str
+        Pillow format used for encoding, either "WEBP" or "PNG".
+    quality: int
+        WEBP quality, from 0 to 100. In lossless mode, this is the compression effort instead.
+    method: int
+        WEBP encoding method, from 0 (fast) to 6 (slow but smaller files).
+    lossless: bool
+        Whether WEBP is encoded without loss.
+    """
+
+    name: str
+    height: int | None = None
+    format: str = "WEBP"
+    quality: int = 80
+    method: int = 4
+    lossless: bool = False
+
+    @property
+    def extension(self) -> str:
+        return self.format.lower()
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    def with_format(self, format: str) -> "CardProfile":
+        return replace(self, format=format.upper())
+
+    def save_options(self) -> dict[str, Any]:
+        if self.format != "WEBP":
+            return {"format": self.format}
+        return {
+            "format": self.format,
+            "quality": self.quality,
+            "method": self.method,
+            "lossless": self.lossless,
+        }
+
+
+PROFILES: dict[str, CardProfile] = {
+    # small previews, cheap to encode and upload
+    "thumbnail": CardProfile("thumbnail", height=500, quality=75, method=2),
+    # about the size at which Discord displays images, used when browsing cards
+    "standard": CardProfile("standard", height=1000, quality=85, method=2),
+    # original size
+    "full": CardProfile("full"),
+}
+
+
 def draw_card(
     ball_instance: "BallInstance",
     media_path: str = "./admin_panel/media/",
+    profile: CardProfile = PROFILES["full"],
 ) -> tuple[Image.Image, dict[str, Any]]:
-    ball = ball_instance.countryball
-    ball_health = (237, 115, 101, 255)
-    ball_credits = ball.credits
-    card_name = ball.cached_regime.name
-    if special_image := ball_instance.special_card:
-        card_name = getattr(ball_instance.specialcard, "name", card_name)
-        image = Image.open(media_path + special_image)
-        if ball_instance.specialcard and ball_instance.specialcard.credits:
-            ball_credits += f" • {ball_instance.specialcard.credits}"
-    else:
-        image = Image.open(media_path + ball.cached_regime.background)
-    image = image.convert("RGBA")
-    icon = (
-        Image.open(media_path + ball.cached_economy.icon).convert("RGBA")
-        if ball.cached_economy
-        else None
-    )
+    return render_card(CardSpec.from_instance(ball_instance, media_path), profile)
+
+
+def render_card_bytes(spec: CardSpec, profile: CardProfile = PROFILES["full"]) -> bytes:
+    """
+    Render the card and return the encoded image. The rendering worker processes call it
+    through `render_card_worker`.
+    """
+    image, kwargs = render_card(spec, profile)
+    buffer = BytesIO()
+    image.save(buffer, **kwargs)
+    image.close()
+    return buffer.getvalue()
+
+
+def asset_fingerprint(path: str) -> tuple[str, int, int]:
+    """
+    Identify the current version of an asset file. If the file is replaced, the modification
+    time and size will change, and so will the cache keys depending on it.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, 0, 0)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+@dataclass
+class CardLayers:
+    """
+    The parts of a card that are shared by all instances of a ball with the same special.
+
+    A full size base takes about 11 MB (1428x2000 RGBA) and saves 25 to 45ms of rendering
+    when reused, roughly half of a render. The cache of layers is therefore only useful for the
+    cards rendered repeatedly, such as the countryballs of an event, not for a whole dex.
+
+    Attributes
+    ----------
+    base: Image.Image
+        Everything that is drawn below the stats: background, texts, artwork and icon.
+    overlays: list[Image.Image]
+        Overlays to composite on top of the card once the stats are drawn, already resized.
+        They belong to the asset cache and are not counted in `nbytes`.
+    """
+
+    base: Image.Image
+    overlays: list[Image.Image]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.base.getbands()) * self.base.width * self.base.height
+
+
+@dataclass
+class TextMask:
+    """
+    Text rasterised once, to be pasted on cards without shaping the glyphs again.
+
+    Attributes
+    ----------
+    offset: tuple[int, int]
+        Position of the masks relative to the anchor of the text.
+    stroke: Image.Image | None
+        Mask of the text outline, including the inside of the glyphs.
+    fill: Image.Image
+        Mask of the glyphs.
+    """
+
+    offset: tuple[int, int]
+    stroke: Image.Image | None
+    fill: Image.Image
+
+    @property
+    def nbytes(self) -> int:
+        return sum(x.width * x.height for x in (self.stroke, self.fill) if x is not None)
+
+
+layers_cache: LRUCache[tuple, CardLayers] = LRUCache(
+    maxsize=256 * 1024 * 1024, getsizeof=lambda x: x.nbytes
+)
+# ball texts only change when edited, and stats take a limited set of values
+text_cache: LRUCache[tuple, TextMask] = LRUCache(
+    maxsize=32 * 1024 * 1024, getsizeof=lambda x: x.nbytes
+)
+asset_cache = AssetCache()
+credits_color_cache = CreditsColorCache()
+
+
+def preload_assets(backgrounds: list[str], icons: list[str], overlays: list[str]):
+    """
+    Decode the assets shared by many cards ahead of time, so that the first renders don't
+    have to.
+    """
+    asset_cache.preload(backgrounds)
+    asset_cache.preload(icons, (192, 192), fit=True)
+    asset_cache.preload(overlays)
+
+
+def init_worker(
+    layers_memory: int,
+    assets_memory: int,
+    preload: tuple[list[str], list[str], list[str]] | None = None,
+    credits_colors_path: Path | None = None,
+):
+    """
+    Configure the caches of a rendering process. This is called when starting the process
+    pool of `ballsdex.core.image_generator.renderer.CardRenderer`.
+    """
+    global layers_cache, asset_cache, credits_color_cache
+    layers_cache = LRUCache(maxsize=layers_memory, getsizeof=lambda x: x.nbytes)
+    text_cache.clear()
+    asset_cache = AssetCache(assets_memory)
+    credits_color_cache = CreditsColorCache(credits_colors_path)
+    if preload:
+        preload_assets(*preload)
+
+
+def rasterize_text(
+    text: str, font: ImageFont.FreeTypeFont, stroke_width: int = 0, anchor: str | None = None
+) -> TextMask:
+    key = (text, font.path, font.size, stroke_width, anchor)
+    try:
+        return text_cache[key]
+    except KeyError:
+        pass
+    left, top, right, bottom = font.getbbox(text, stroke_width=stroke_width, anchor=anchor)
+    origin = (-left, -top)
+    stroke = None
+    if stroke_width:
+        stroke = Image.new("L", (right - left, bottom - top))
+        ImageDraw.Draw(stroke).text(
+            origin, text, fill=255, font=font, stroke_width=stroke_width, anchor=anchor
+        )
+    fill = Image.new("L", (right - left, bottom - top))
+    ImageDraw.Draw(fill).text(origin, text, fill=255, font=font, anchor=anchor)
+    mask = TextMask(offset=(left, top), stroke=stroke, fill=fill)
+    try:
+        text_cache[key] = mask
+    except ValueError:  # larger than the cache
+        pass
+    return mask
+
+
+def draw_text(
+    image: Image.Image,
+    xy: tuple[int, int],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    fill: tuple[int, int, int, int] = (255, 255, 255, 255),
+    stroke_width: int = 0,
+    stroke_fill: tuple[int, int, int, int] = (0, 0, 0, 255),
+    anchor: str | None = None,
+):
+    """
+    Draw a single line of text like `ImageDraw.text`, reusing the glyphs rasterised for
+    previous cards.
+    """
+    mask = rasterize_text(text, font, stroke_width, anchor)
+    position = (xy[0] + mask.offset[0], xy[1] + mask.offset[1])
+    if mask.stroke is not None:
+        image.paste(stroke_fill, position, mask.stroke)
+        if stroke_fill == fill:
+            return
+    image.paste(fill, position, mask.fill)
+
+
+def get_layers(spec: CardSpec) -> CardLayers:
+    assets = [spec.background, spec.artwork, *spec.overlays]
+    if spec.economy_icon:
+        assets.append(spec.economy_icon)
+    # stats are the only thing that differ between instances
+    key = (replace(spec, health=0, attack=0), tuple(asset_fingerprint(x) for x in assets))
+    try:
+        return layers_cache[key]
+    except KeyError:
+        pass
+    layers = build_layers(spec)
+    try:
+        layers_cache[key] = layers
+    except ValueError:  # larger than the cache
+        pass
+    return layers
+
+
+def build_layers(spec: CardSpec) -> CardLayers:
+    image = asset_cache.get(spec.background).copy()
 
     draw = ImageDraw.Draw(image)
-    draw.text(
-        (50, 20),
-        ball.short_name or ball.country,
-        font=title_font,
-        stroke_width=2,
-        stroke_fill=(0, 0, 0, 255),
-    )
+    draw_text(image, (50, 20), spec.title, title_font, stroke_width=2)
 
-    cap_name = textwrap.wrap(f"Ability: {ball.capacity_name}", width=26)
+    cap_name = wrap_text(f"Ability: {spec.capacity_name}", 26)
 
     for i, line in enumerate(cap_name):
-        draw.text(
+        draw_text(
+            image,
             (100, 1050 + 100 * i),
             line,
-            font=capacity_name_font,
+            capacity_name_font,
             fill=(230, 230, 230, 255),
             stroke_width=2,
-            stroke_fill=(0, 0, 0, 255),
         )
-    for i, line in enumerate(textwrap.wrap(ball.capacity_description, width=32)):
-        draw.text(
+    for i, line in enumerate(wrap_text(spec.capacity_description, 32)):
+        draw_text(
+            image,
             (60, 1100 + 100 * len(cap_name) + 80 * i),
             line,
-            font=capacity_description_font,
+            capacity_description_font,
             stroke_width=1,
-            stroke_fill=(0, 0, 0, 255),
         )
 
-    draw.text(
-        (320, 1670),
-        str(ball_instance.health),
-        font=stats_font,
-        fill=ball_health,
-        stroke_width=1,
-        stroke_fill=(0, 0, 0, 255),
-    )
-    draw.text(
-        (1120, 1670),
-        str(ball_instance.attack),
-        font=stats_font,
-        fill=(252, 194, 76, 255),
-        stroke_width=1,
-        stroke_fill=(0, 0, 0, 255),
-        anchor="ra",
-    )
-    if card_name in credits_color_cache:
-        credits_color = credits_color_cache[card_name]
-    else:
+    credits_color = credits_color_cache.get(spec.background)
+    if credits_color is None:
+        # computed on the background alone, so that it only depends on that file
         credits_color = get_credit_color(
-            image, (0, int(image.height * 0.8), image.width, image.height)
+            asset_cache.get(spec.background),
+            (0, int(image.height * 0.8), image.width, image.height),
         )
-        credits_color_cache[card_name] = credits_color
+        credits_color_cache.set(spec.background, credits_color)
     draw.text(
         (30, 1870),
         # Modifying the line below is breaking the licence as you are removing credits
         # If you don't want to receive a DMCA, just don't
-        f"Created by El Laggron\nArtwork author: {ball_credits}",
+        f"Created by El Laggron\nArtwork author: {spec.credits}",
         font=credits_font,
         fill=credits_color,
         stroke_width=0,
         stroke_fill=(255, 255, 255, 255),
     )
 
-    artwork = Image.open(media_path + ball.collection_card).convert("RGBA")
-    image.paste(ImageOps.fit(artwork, artwork_size), CORNERS[0])  # type: ignore
+    image.paste(asset_cache.get(spec.artwork, artwork_size, fit=True), CORNERS[0])
 
-    if icon:
-        icon = ImageOps.fit(icon, (192, 192))
+    if spec.economy_icon:
+        icon = asset_cache.get(spec.economy_icon, (192, 192), fit=True)
         image.paste(icon, (1200, 30), mask=icon)
-        icon.close()
-    artwork.close()
 
-    if ball.overlay:
-        overlay = Image.open(media_path + ball.overlay).convert("RGBA")
-        overlay = overlay.resize((image.width, image.height))
+    overlays = [asset_cache.get(x, (image.width, image.height)) for x in spec.overlays]
+    return CardLayers(base=image, overlays=overlays)
+
+
+def render_card_worker(
+    spec: CardSpec, profile: CardProfile = PROFILES["full"]
+) -> tuple[bytes, AssetCacheStats]:
+    """
+    Same as `render_card_bytes`, also returning the statistics of the process' asset cache.
+    """
+    return render_card_bytes(spec, profile), asset_cache.stats()
+
+
+def render_card(
+    spec: CardSpec, profile: CardProfile = PROFILES["full"]
+) -> tuple[Image.Image, dict[str, Any]]:
+    layers = get_layers(spec)
+    image = layers.base.copy()
+
+    draw_text(
+        image, (320, 1670), str(spec.health), stats_font, (237, 115, 101, 255), stroke_width=1
+    )
+    draw_text(
+        image,
+        (1120, 1670),
+        str(spec.attack),
+        stats_font,
+        (252, 194, 76, 255),
+        stroke_width=1,
+        anchor="ra",
+    )
+
+    for overlay in layers.overlays:
         image = Image.alpha_composite(image, overlay)
-        overlay.close()
 
-    if ball_instance.specialcard and getattr(ball_instance.specialcard, "overlay", None):
-        special_overlay = Image.open(media_path + ball_instance.specialcard.overlay).convert(
-            "RGBA"
-        )
-        special_overlay = special_overlay.resize((image.width, image.height))
-        image = Image.alpha_composite(image, special_overlay)
-        special_overlay.close()
+    if profile.height is not None and profile.height != image.height:
+        width = round(image.width * profile.height / image.height)
+        image = image.resize((width, profile.height), Image.Resampling.LANCZOS, reducing_gap=3.0)
 
-    return image, {"format": "WEBP"}
+    return image, profile.save_options()
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from ballsdex.core.image_generator.assets import AssetCacheStats
+from ballsdex.core.image_generator.cache import CardCache
+from ballsdex.core.image_generator.image_gen import (
+    PROFILES,
+    CardProfile,
+    CardSpec,
+    init_worker,
+    preload_assets,
+    render_card_worker,
+)
+from ballsdex.core.metrics import (
+    asset_cache_hits,
+    asset_cache_memory,
+    asset_cache_misses,
+    prerender_dropped,
+    render_queue_size,
+    render_time,
+)
+
+if TYPE_CHECKING:
+    from ballsdex.core.models import BallInstance
+
+log = logging.getLogger("ballsdex.core.image_generator.renderer")
+
+# every worker has its own caches (layers, assets and texts, about 550 MB with the default
+# settings), so the pool is kept small instead of following the number of CPUs
+DEFAULT_WORKERS = 2
+
+
+class CardRenderer:
+    """
+    Long-lived card rendering service. Cards are drawn in a bounded pool of worker processes
+    to keep Pillow's work away from the event loop and the GIL.
+
+    Requests waiting for a worker are limited to `max_queue`, after which callers wait for a
+    slot (backpressure). The whole operation, including the wait, is bound by `timeout`.
+
+    Parameters
+    ----------
+    media_path: str
+        Path to the directory containing the uploaded assets.
+    workers: int | None
+        Number of worker processes. Defaults to `DEFAULT_WORKERS`, or the number of CPUs if
+        lower.
+    max_queue: int
+        Maximum number of render requests submitted to the pool at once.
+    timeout: float
+        Number of seconds before a render request is abandoned.
+    cache: CardCache | None
+        If provided, rendered cards are stored there and served without rendering again.
+    layers_memory: int
+        Maximum size in bytes of the card layers kept by each worker process, see
+        `ballsdex.core.image_generator.image_gen.CardLayers`.
+    assets_memory: int
+        Maximum size in bytes of the decoded assets kept by each worker process, see
+        `ballsdex.core.image_generator.assets.AssetCache`.
+    prerender_profiles: tuple[CardProfile, ...]
+        Profiles rendered in the background by `prerender`. Empty to disable pre-rendering.
+    """
+
+    def __init__(
+        self,
+        media_path: str = "./admin_panel/media/",
+        *,
+        workers: int | None = None,
+        max_queue: int = 64,
+        timeout: float = 10,
+        cache: CardCache | None = None,
+        layers_memory: int = 256 * 1024 * 1024,
+        assets_memory: int = 256 * 1024 * 1024,
+        prerender_profiles: tuple[CardProfile, ...] = (),
+    ):
+        self.media_path = media_path
+        self.workers = workers or min(DEFAULT_WORKERS, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.cache = cache
+        self.layers_memory = layers_memory
+        self.assets_memory = assets_memory
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._preload: tuple[list[str], list[str], list[str]] | None = None
+        self._worker_stats: dict[int, AssetCacheStats] = {}
+        self.prerender_profiles = prerender_profiles
+        self._prerender_queue: asyncio.Queue[tuple[CardSpec, CardProfile]] | None = None
+        self._prerender_tasks: list[asyncio.Task] = []
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            credits_colors_path = None
+            if self.cache is not None and self.cache.path is not None:
+                credits_colors_path = self.cache.path / "credits-colors.json"
+            # "spawn" avoids forking the whole bot (and its event loop) into each worker
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(
+                    self.layers_memory,
+                    self.assets_memory,
+                    self._preload,
+                    credits_colors_path,
+                ),
+            )
+            log.debug(f"Started card rendering pool with {self._executor._max_workers} workers")
+        return self._executor
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        # the admin panel may run views in different event loops
+        try:
+            return self._semaphores[loop]
+        except KeyError:
+            for old_loop in [x for x in self._semaphores if x.is_closed()]:
+                del self._semaphores[old_loop]
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_queue)
+            return semaphore
+
+    def _shutdown_executor(self, *, cancel_futures: bool):
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=cancel_futures)
+        self._executor = None
+        for pid in self._worker_stats:
+            asset_cache_memory.remove(str(pid))
+        self._worker_stats.clear()
+
+    async def warm_up(self, backgrounds: list[str], icons: list[str], overlays: list[str]):
+        """
+        Start the rendering processes and decode the given assets in each of them, so that
+        the first renders don't have to.
+
+        If the processes are already running with the same assets, they are kept along with
+        their caches, and only decode again the files replaced since (the caches are keyed by
+        modification time). They are only replaced, once they finish their current work, when
+        the list of assets changed.
+
+        Parameters
+        ----------
+        backgrounds: list[str]
+            Card backgrounds, relative to the media path.
+        icons: list[str]
+            Economy icons, relative to the media path.
+        overlays: list[str]
+            Card overlays, relative to the media path.
+        """
+        preload = (
+            [self.media_path + x for x in backgrounds],
+            [self.media_path + x for x in icons],
+            [self.media_path + x for x in overlays],
+        )
+        loop = asyncio.get_running_loop()
+        if self._executor is not None and preload == self._preload:
+            # not targeted at each process, but decoding takes long enough to spread the calls
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._executor, preload_assets, *preload)
+                    for _ in range(self._executor._max_workers)
+                )
+            )
+            return
+        self._preload = preload
+        self._shutdown_executor(cancel_futures=False)
+        executor = self.executor
+        # the assets are loaded by the initializer, make sure all processes are started now
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, os.getpid) for _ in range(executor._max_workers))
+        )
+
+    def _record_stats(self, stats: AssetCacheStats):
+        previous = self._worker_stats.get(stats.pid)
+        asset_cache_hits.inc(stats.hits - (previous.hits if previous else 0))
+        asset_cache_misses.inc(stats.misses - (previous.misses if previous else 0))
+        asset_cache_memory.labels(worker=str(stats.pid)).set(stats.memory)
+        self._worker_stats[stats.pid] = stats
+
+    @staticmethod
+    def _release(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore, future: Future):
+        render_queue_size.dec()
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:  # event loop closed, happens on shutdown
+            pass
+
+    async def render_spec(self, spec: CardSpec, profile: CardProfile = PROFILES["full"]) -> bytes:
+        """
+        Render a card from its specification and return the encoded image.
+
+        Parameters
+        ----------
+        spec: CardSpec
+            The inputs of the card generation.
+        profile: CardProfile
+            Size and encoding settings of the output.
+
+        Raises
+        ------
+        TimeoutError
+            The card could not be rendered within the configured timeout.
+        """
+        if self.cache is None:
+            return await self._render(spec, profile)
+        key = self.cache.key(spec, profile)
+        if (data := await self.cache.get(key)) is not None:
+            return data
+        data = await self._render(spec, profile)
+        await self.cache.set(key, data)
+        return data
+
+    async def _render(self, spec: CardSpec, profile: CardProfile) -> bytes:
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore(loop)
+        start = time.perf_counter()
+        async with asyncio.timeout(self.timeout):
+            await semaphore.acquire()
+            render_queue_size.inc()
+            try:
+                future = self.executor.submit(render_card_worker, spec, profile)
+            except BaseException:
+                render_queue_size.dec()
+                semaphore.release()
+                raise
+            # the slot is only given back once the worker is done, even if we stop waiting
+            future.add_done_callback(functools.partial(self._release, loop, semaphore))
+            result, stats = await asyncio.wrap_future(future)
+        render_time.observe(time.perf_counter() - start)
+        self._record_stats(stats)
+        return result
+
+    async def render(
+        self, ball_instance: "BallInstance", profile: CardProfile = PROFILES["full"]
+    ) -> bytes:
+        """
+        Render the card of a ball instance and return the encoded image.
+        """
+        return await self.render_spec(
+            CardSpec.from_instance(ball_instance, self.media_path), profile
+        )
+
+    def prerender(self, ball_instance: "BallInstance"):
+        """
+        Queue the card of a newly obtained instance for rendering in the background, so that
+        its first display is served from cache instead of being rendered within the
+        interaction's deadline.
+
+        This returns immediately. Nothing is done if pre-rendering is disabled, and requests are
+        dropped if the pre-rendering queue is full.
+        """
+        if not self.prerender_profiles or self.cache is None:
+            return
+        if self._prerender_queue is None:
+            self._prerender_queue = asyncio.Queue(maxsize=self.max_queue * 4)
+            # few consumers, leaving most of the pool available for interactive requests
+            self._prerender_tasks = [
+                asyncio.create_task(self._prerender_loop(self._prerender_queue)) for _ in range(2)
+            ]
+        spec = CardSpec.from_instance(ball_instance, self.media_path)
+        for profile in self.prerender_profiles:
+            try:
+                self._prerender_queue.put_nowait((spec, profile))
+            except asyncio.QueueFull:
+                prerender_dropped.inc()
+
+    async def _prerender_loop(self, queue: asyncio.Queue[tuple[CardSpec, CardProfile]]):
+        while True:
+            spec, profile = await queue.get()
+            try:
+                await self.render_spec(spec, profile)
+            except Exception:
+                log.warning(f"Failed to pre-render card {spec.title}", exc_info=True)
+
+    def close(self):
+        for task in self._prerender_tasks:
+            task.cancel()
+        self._prerender_tasks.clear()
+        self._prerender_queue = None
+        self._shutdown_executor(cancel_futures=True)
@@ -16,6 +16,39 @@ log = logging.getLogger("ballsdex.core.metrics")
 caught_balls = Counter(
     "caught_cb", "Caught countryballs", ["country", "special", "guild_size", "spawn_algo"]
 )
+render_queue_size = Gauge("card_render_queue", "Number of cards being rendered or waiting to be")
+card_cache_hits = Counter("card_cache_hits", "Rendered cards served from cache", ["tier"])
+card_cache_misses = Counter("card_cache_misses", "Rendered cards not found in cache")
+asset_cache_hits = Counter("card_asset_cache_hits", "Card assets served already decoded")
+asset_cache_misses = Counter("card_asset_cache_misses", "Card assets that had to be decoded")
+asset_cache_memory = Gauge(
+    "card_asset_cache_memory",
+    "Bytes of decoded card assets held per rendering process",
+    ["worker"],
+)
+prerender_dropped = Counter(
+    "card_prerender_dropped", "Card pre-rendering requests dropped because the queue was full"
+)
+render_time = Histogram(
+    "card_render_time",
+    "Time taken to render a card, including the time spent in queue",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, float("inf")),
+)
+
+spawn_manager_memory = Gauge(
+    "spawn_manager_memory",
+    "Approximate bytes held by the spawn manager for the state of guilds",
+    ["manager"],
+)
+
+counters_backlog = Gauge(
+    "player_counters_backlog", "Number of players with counters waiting to be written"
+)
+counters_flush_time = Histogram(
+    "player_counters_flush_time",
+    "Time taken to write the buffered counters of players",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf")),
+)
 
 
 class PrometheusServer:
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import IntEnum
 from io import BytesIO
@@ -8,11 +7,13 @@ from typing import TYPE_CHECKING, Iterable, Tuple, Type
 
 import discord
 from discord.utils import format_dt
-from tortoise import exceptions, fields, models, signals, timezone, validators
+from tortoise import Tortoise, exceptions, fields, models, signals, timezone, validators
 from tortoise.contrib.postgres.indexes import PostgreSQLIndex
 from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
 
-from ballsdex.core.image_generator.image_gen import draw_card
+from ballsdex.core.counters import player_counters
+from ballsdex.core.image_generator.image_gen import PROFILES, CardProfile, draw_card
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -220,8 +221,12 @@ Ball.register_listener(signals.Signals.pre_save, lower_catch_names)
 Ball.register_listener(signals.Signals.pre_save, lower_translations)
 
 
+# Caught instances are inserted with a raw statement (see `CATCH_QUERY` in the countryballs
+# package). Its columns and values are built from the fields of this model, but the save
+# signals do not run.
 class BallInstance(models.Model):
     ball_id: int
+    player_id: int
     special_id: int
     trade_player_id: int
 
@@ -350,8 +355,8 @@ class BallInstance(models.Model):
                     text = f"{emoji} {text}"
         return text
 
-    def draw_card(self) -> BytesIO:
-        image, kwargs = draw_card(self)
+    def draw_card(self, profile: CardProfile = PROFILES["full"]) -> BytesIO:
+        image, kwargs = draw_card(self, profile=profile)
         buffer = BytesIO()
         image.save(buffer, **kwargs)
         buffer.seek(0)
@@ -359,7 +364,9 @@ class BallInstance(models.Model):
         return buffer
 
     async def prepare_for_message(
-        self, interaction: discord.Interaction["BallsDexBot"]
+        self,
+        interaction: discord.Interaction["BallsDexBot"],
+        profile: CardProfile = PROFILES["full"],
     ) -> Tuple[str, discord.File, discord.ui.View]:
         # message content
         trade_content = ""
@@ -401,11 +408,10 @@ class BallInstance(models.Model):
         )
 
         # draw image
-        with ThreadPoolExecutor() as pool:
-            buffer = await interaction.client.loop.run_in_executor(pool, self.draw_card)
+        buffer = BytesIO(await interaction.client.card_renderer.render(self, profile))
 
         view = discord.ui.View()
-        return content, discord.File(buffer, "card.webp"), view
+        return content, discord.File(buffer, f"card.{profile.extension}"), view
 
     async def lock_for_trade(self):
         self.locked = timezone.now()
@@ -450,6 +456,16 @@ class TradeCooldownPolicy(IntEnum):
     BYPASS = 2
 
 
+class CoinTransactionReason(IntEnum):
+    OTHER = 0
+    CATCH = 1
+    TRADE = 2
+    BATTLE = 3
+    PACK = 4
+    DONATION = 5
+    ADMIN = 6
+
+
 class Player(models.Model):
     discord_id = fields.BigIntField(
         description="Discord user ID", unique=True, validators=[DiscordSnowflakeValidator()]
@@ -500,21 +516,156 @@ class Player(models.Model):
     async def is_blocked(self, other_player: "Player") -> bool:
         return await Block.filter((Q(player1=self) & Q(player2=other_player))).exists()
 
-    async def add_coins(self, amount: int):
-        self.coins += amount
-        await self.save(update_fields=("coins",))
-
-    async def remove_coins(self, amount: int):
-        if self.coins < amount:
-            raise ValueError("Not enough coins")
-        self.coins -= amount
-        await self.save(update_fields=("coins",))
+    async def add_coins(
+        self,
+        amount: int,
+        reason: CoinTransactionReason = CoinTransactionReason.OTHER,
+        *,
+        buffered: bool = False,
+    ):
+        await CoinTransaction.apply([(self, amount)], reason, buffered=buffered)
+
+    async def remove_coins(
+        self, amount: int, reason: CoinTransactionReason = CoinTransactionReason.OTHER
+    ):
+        await CoinTransaction.apply([(self, -amount)], reason)
+
+    async def add_activity(self, *, trades: int = 0, battles: int = 0):
+        """
+        Count trades or battles done today, buffered if `player_counters` is enabled.
+        """
+        self.trades_today += trades
+        self.battles_today += battles
+        if player_counters.enabled:
+            await player_counters.add(self.pk, trades_today=trades, battles_today=battles)
+            return
+        # do not overwrite the coins, they are only changed by the ledger
+        await self.save(update_fields=("trades_today", "battles_today"))
 
     @property
     def can_be_mentioned(self) -> bool:
         return self.mention_policy == MentionPolicy.ALLOW
 
 
+# Change the coins of several players and record it in the ledger, in a single statement.
+# Players who would end up with negative coins are left untouched and not returned.
+APPLY_COINS_QUERY = """
+WITH changes (player_id, amount) AS (
+    SELECT * FROM unnest($1::bigint[], $2::bigint[])
+), updated AS (
+    UPDATE player SET coins = player.coins + changes.amount
+    FROM changes
+    WHERE player.id = changes.player_id
+        AND (changes.amount >= 0 OR player.coins + changes.amount >= 0)
+    RETURNING player.id, player.coins, changes.amount
+), ledger AS (
+    INSERT INTO cointransaction (player_id, amount, balance, reason, date)
+    SELECT id, amount, coins, $3::smallint, now() FROM updated
+)
+SELECT id, coins FROM updated
+"""
+
+
+class CoinTransaction(models.Model):
+    """
+    Append-only ledger of the changes of coins, the balance of a player can be audited or
+    replayed from it. Use `apply` to change coins, never modify `Player.coins` directly.
+    """
+
+    id: int
+    player_id: int
+
+    player: fields.ForeignKeyRelation[Player] = fields.ForeignKeyField(
+        "models.Player", related_name="coin_transactions"
+    )
+    amount = fields.BigIntField(description="Coins added, negative if removed")
+    balance = fields.BigIntField(description="Coins of the player after this transaction")
+    reason = fields.IntEnumField(
+        CoinTransactionReason,
+        description="What the coins were changed for",
+        default=CoinTransactionReason.OTHER,
+    )
+    date = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [PostgreSQLIndex(fields=("player_id",))]
+
+    def __str__(self) -> str:
+        return str(self.pk)
+
+    @classmethod
+    async def apply(
+        cls,
+        changes: Iterable[tuple[Player, int]],
+        reason: CoinTransactionReason,
+        *,
+        buffered: bool = False,
+        using_db: BaseDBAsyncClient | None = None,
+    ) -> None:
+        """
+        Atomically change the coins of one or more players in a single statement, and record
+        the changes in the ledger. The `coins` attribute of the given players is updated with
+        their new balance.
+
+        Parameters
+        ----------
+        changes: Iterable[tuple[Player, int]]
+            The players and the amount of coins to add to them, negative to remove. Several
+            changes of the same player are summed.
+        reason: CoinTransactionReason
+            What the coins are changed for.
+        buffered: bool
+            If `player_counters` is enabled and coins are only added, delay the write to the
+            next flush of the buffer. Use this for frequent rewards.
+        using_db: BaseDBAsyncClient | None
+            Run the statement in this transaction. If a player does not have enough coins, the
+            error must roll it back, the other players may have been changed.
+
+        Raises
+        ------
+        ValueError
+            A player does not have enough coins. No change is made at all.
+        """
+        players: list[Player] = []
+        deltas: dict[int, int] = {}
+        for player, amount in changes:
+            players.append(player)
+            deltas[player.pk] = deltas.get(player.pk, 0) + amount
+        deltas = {pk: amount for pk, amount in deltas.items() if amount}
+        if not deltas:
+            return
+
+        if player_counters.enabled:
+            if buffered and all(x > 0 for x in deltas.values()):
+                merged = {x.pk: x for x in players}
+                for pk, amount in deltas.items():
+                    await player_counters.add(pk, coins=amount, reason=reason)
+                    merged[pk].coins += amount
+                return
+            # the balance must include the pending rewards of the players
+            await player_counters.flush(players)
+
+        values = [list(deltas.keys()), list(deltas.values()), reason.value]
+        if len(deltas) == 1 or using_db is not None:
+            # a single statement is already atomic, or part of the transaction of the caller
+            _, rows = await (using_db or Tortoise.get_connection("default")).execute_query(
+                APPLY_COINS_QUERY, values
+            )
+            if len(rows) != len(deltas):
+                raise ValueError("Not enough coins")
+        else:
+            async with in_transaction() as connection:
+                _, rows = await connection.execute_query(APPLY_COINS_QUERY, values)
+                if len(rows) != len(deltas):
+                    # rolls back the changes made to the other players
+                    raise ValueError("Not enough coins")
+
+        balances = {row["id"]: row["coins"] for row in rows}
+        for player in players:
+            if player.pk in balances:
+                player.coins = balances[player.pk]
+
+
 class BlacklistedID(models.Model):
     discord_id = fields.BigIntField(
         description="Discord user ID", unique=True, validators=[DiscordSnowflakeValidator()]
@@ -0,0 +1,154 @@
+from typing import TYPE_CHECKING, Iterable, Type
+
+from cachetools import TTLCache
+from tortoise import signals
+
+from ballsdex.core.models import BallInstance, Player
+
+if TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+def bits(mask: int) -> set[int]:
+    """
+    Return the positions of the bits set in an integer.
+    """
+    positions: set[int] = set()
+    while mask:
+        lowest = mask & -mask
+        positions.add(lowest.bit_length() - 1)
+        mask ^= lowest
+    return positions
+
+
+class PlayerCompletion:
+    """
+    The collectibles owned by a player, as bitsets over the ball IDs, overall and for each
+    special.
+    """
+
+    __slots__ = ("owned",)
+
+    def __init__(self):
+        # the `None` key is the bitset of all owned collectibles, regardless of their special
+        self.owned: dict[int | None, int] = {None: 0}
+
+    def add(self, ball_id: int, special_id: int | None = None):
+        self.owned[None] |= 1 << ball_id
+        if special_id is not None:
+            self.owned[special_id] = self.owned.get(special_id, 0) | 1 << ball_id
+
+    def has(self, ball_id: int, special_id: int | None = None) -> bool:
+        """
+        Check if the player owns the collectible, with the given special if any.
+        """
+        return bool(self.owned.get(special_id, 0) >> ball_id & 1)
+
+    def ball_ids(self, special_id: int | None = None) -> set[int]:
+        """
+        Return the IDs of the owned collectibles, with the given special if any.
+        """
+        return bits(self.owned.get(special_id, 0))
+
+
+class CompletionCache:
+    """
+    Completion of the most recent players, kept up to date when their collectibles change
+    instead of querying every owned ball ID each time.
+
+    Instances saved through the ORM are tracked with signals. Code changing the owner of
+    instances or deleting them in bulk must call `invalidate` for the players losing them.
+    Entries also expire after some time, for the changes made from the admin panel.
+
+    Parameters
+    ----------
+    maxsize: int
+        Maximum number of players kept.
+    ttl: float
+        Number of seconds before an entry is loaded again from the database.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 600):
+        self.players: TTLCache[int, PlayerCompletion] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # number of loads in progress for each player, and the changes made to these players
+        # meanwhile, to discard what was loaded concurrently with a change
+        self.loading: dict[int, int] = {}
+        self.versions: dict[int, int] = {}
+
+    async def get(self, player: Player) -> PlayerCompletion:
+        """
+        Return the completion of a player, loading it with a single query if not cached.
+        """
+        if (completion := self.players.get(player.pk)) is not None:
+            return completion
+        self.loading[player.pk] = self.loading.get(player.pk, 0) + 1
+        version = self.versions.get(player.pk, 0)
+        try:
+            rows = (
+                await BallInstance.filter(player_id=player.pk, deleted=False)
+                .distinct()
+                .values_list("ball_id", "special_id")
+            )
+        finally:
+            changed = self.versions.get(player.pk, 0) != version
+            self.loading[player.pk] -= 1
+            if not self.loading[player.pk]:
+                del self.loading[player.pk]
+                self.versions.pop(player.pk, None)
+        completion = PlayerCompletion()
+        for ball_id, special_id in rows:
+            completion.add(ball_id, special_id)
+        if not changed:
+            self.players[player.pk] = completion
+        return completion
+
+    def peek(self, player_id: int) -> PlayerCompletion | None:
+        """
+        Return the completion of a player if cached, without querying the database.
+        """
+        return self.players.get(player_id)
+
+    def _changed(self, player_id: int):
+        if player_id in self.loading:
+            self.versions[player_id] = self.versions.get(player_id, 0) + 1
+
+    def add(self, player_id: int, ball_id: int, special_id: int | None = None):
+        self._changed(player_id)
+        if (completion := self.players.get(player_id)) is not None:
+            completion.add(ball_id, special_id)
+
+    def invalidate(self, player_ids: Iterable[int]):
+        """
+        Forget the completion of players who lost collectibles, it is loaded again when needed.
+        """
+        for player_id in player_ids:
+            self._changed(player_id)
+            self.players.pop(player_id, None)
+
+
+completion_cache = CompletionCache()
+
+
+async def track_saved_instance(
+    model: Type[BallInstance],
+    instance: BallInstance,
+    created: bool,
+    using_db: "BaseDBAsyncClient | None" = None,
+    update_fields: Iterable[str] | None = None,
+):
+    if instance.deleted:
+        completion_cache.invalidate([instance.player_id])
+    else:
+        completion_cache.add(instance.player_id, instance.ball_id, instance.special_id)
+
+
+async def track_deleted_instance(
+    model: Type[BallInstance],
+    instance: BallInstance,
+    using_db: "BaseDBAsyncClient | None" = None,
+):
+    completion_cache.invalidate([instance.player_id])
+
+
+BallInstance.register_listener(signals.Signals.post_save, track_saved_instance)
+BallInstance.register_listener(signals.Signals.post_delete, track_deleted_instance)
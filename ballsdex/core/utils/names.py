@@ -0,0 +1,79 @@
+from collections import defaultdict
+from typing import Iterable
+
+from ballsdex.core.models import Ball
+
+# fancy unicode quotes typed by some keyboards, like ’ instead of '
+QUOTES_TABLE = str.maketrans(
+    {
+        "\u2018": "'",
+        "\u2019": "'",
+        "\u201a": "'",
+        "\u201b": "'",
+        "\u2032": "'",
+        "\u201c": '"',
+        "\u201d": '"',
+        "\u201e": '"',
+        "\u201f": '"',
+        "\u2033": '"',
+    }
+)
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalize a name for comparisons: fold the case and the quotes, and collapse blank
+    characters.
+    """
+    return " ".join(text.translate(QUOTES_TABLE).casefold().split())
+
+
+class NameIndex:
+    """
+    Map the normalized names of collectibles, catch names and translations to their IDs, so
+    that checking a guess is a single lookup.
+    """
+
+    __slots__ = ("names", "indexed")
+
+    def __init__(self):
+        self.names: dict[str, set[int]] = defaultdict(set)
+        self.indexed: set[int] = set()
+
+    def rebuild(self, balls: Iterable[Ball]):
+        """
+        Replace the indexed collectibles, this must be called after the cache is loaded.
+        """
+        self.names.clear()
+        self.indexed.clear()
+        for ball in balls:
+            self.add(ball)
+
+    def add(self, ball: Ball):
+        names = [ball.country]
+        if ball.catch_names:
+            names.extend(ball.catch_names.split(";"))
+        if ball.translations:
+            names.extend(ball.translations.split(";"))
+        for name in names:
+            if name := normalize_name(name):
+                self.names[name].add(ball.pk)
+        self.indexed.add(ball.pk)
+
+    def lookup(self, text: str) -> set[int]:
+        """
+        Return the IDs of the collectibles with this name.
+        """
+        return self.names.get(normalize_name(text), set())
+
+    def matches(self, ball: Ball, text: str) -> bool:
+        """
+        Check if the text is one of the names of the collectible.
+        """
+        if ball.pk not in self.indexed:
+            # not in the cache, such as a collectible created after loading it
+            self.add(ball)
+        return ball.pk in self.lookup(text)
+
+
+catch_name_index = NameIndex()
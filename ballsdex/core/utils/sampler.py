@@ -0,0 +1,67 @@
+import random
+from bisect import bisect
+from itertools import accumulate
+from typing import Generic, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+class WeightedSampler(Generic[T]):
+    """
+    Draw random items in proportion to their weight.
+
+    The cumulative weights are computed once, then each draw is a binary search over them,
+    instead of rebuilding the weights for every call of `random.choices`. Samplers are
+    immutable, build a new one when the population changes.
+
+    Parameters
+    ----------
+    population: Iterable[T]
+        The items to draw from.
+    weights: Iterable[float]
+        The weight of each item, in the same order. Items with a null or negative weight are
+        never drawn and left out.
+    """
+
+    __slots__ = ("population", "cum_weights", "total")
+
+    def __init__(self, population: Iterable[T], weights: Iterable[float]):
+        items = [(item, weight) for item, weight in zip(population, weights) if weight > 0]
+        self.population: tuple[T, ...] = tuple(x[0] for x in items)
+        self.cum_weights: tuple[float, ...] = tuple(accumulate(x[1] for x in items))
+        self.total: float = self.cum_weights[-1] if self.cum_weights else 0
+
+    def __len__(self) -> int:
+        return len(self.population)
+
+    def __bool__(self) -> bool:
+        return bool(self.population)
+
+    def choice(self) -> T:
+        """
+        Draw one item.
+
+        Raises
+        ------
+        IndexError
+            The sampler is empty.
+        """
+        if not self.population:
+            raise IndexError("Cannot choose from an empty sampler")
+        # the upper bound guards against rounding errors, like `random.choices`
+        return self.population[
+            bisect(self.cum_weights, random.random() * self.total, 0, len(self.population) - 1)
+        ]
+
+    def sample(self, k: int) -> list[T]:
+        """
+        Draw ``k`` items, with replacement.
+
+        Raises
+        ------
+        IndexError
+            The sampler is empty.
+        """
+        if not self.population:
+            raise IndexError("Cannot choose from an empty sampler")
+        return random.choices(self.population, cum_weights=self.cum_weights, k=k)
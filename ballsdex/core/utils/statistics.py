@@ -0,0 +1,129 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from tortoise import Tortoise
+
+from ballsdex.core.models import Ball, BallSeasons, Player
+
+# The first grouping set counts every matching instance, the second one counts them per
+# special. `GROUPING(special_id)` tells both apart, since `special_id` is null for the first
+# set and for the instances without a special. Instances caught outside of a server (null
+# `server_id`) count as one server, like they always did.
+STATISTICS_QUERY = """
+SELECT
+    GROUPING(special_id) = 1 AS overall,
+    special_id,
+    count(*) AS total,
+    count(*) FILTER (WHERE trade_player_id IS NULL AND NOT packed) AS caught,
+    count(*) FILTER (WHERE trade_player_id IS NOT NULL) AS traded,
+    count(*) FILTER (WHERE trade_player_id IS NULL AND packed) AS packed,
+    count(DISTINCT ball_id) AS collectibles,
+    count(DISTINCT coalesce(server_id, 0)) AS servers,
+    count(DISTINCT player_id) AS players
+FROM ballinstance
+WHERE {conditions}
+GROUP BY GROUPING SETS ((), (special_id))
+"""
+
+
+@dataclass(slots=True)
+class CollectionStatistics:
+    """
+    Counts of the instances matching some filters, see `collection_statistics`.
+
+    Attributes
+    ----------
+    total: int
+        Number of instances.
+    caught: int
+        Caught by their owner, neither traded nor packed.
+    traded: int
+        Received from a trade or a donation.
+    packed: int
+        Obtained from a pack and never traded.
+    collectibles: int
+        Number of different collectibles.
+    servers: int
+        Number of servers where they were caught.
+    players: int
+        Number of different owners.
+    specials: dict[int, int]
+        Number of instances of each special, by special ID.
+    """
+
+    total: int = 0
+    caught: int = 0
+    traded: int = 0
+    packed: int = 0
+    collectibles: int = 0
+    servers: int = 0
+    players: int = 0
+    specials: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def special(self) -> int:
+        """
+        Number of instances with a special.
+        """
+        return sum(self.specials.values())
+
+
+async def collection_statistics(
+    *,
+    player: Player | None = None,
+    ball: Ball | None = None,
+    season: BallSeasons | None = None,
+    server_id: int | None = None,
+    since: datetime | None = None,
+) -> CollectionStatistics:
+    """
+    Count the non-deleted instances matching the given filters, in a single aggregate query
+    instead of loading them.
+
+    Parameters
+    ----------
+    player: Player | None
+        Only count the instances owned by this player.
+    ball: Ball | None
+        Only count the instances of this collectible.
+    season: BallSeasons | None
+        Only count the instances of the collectibles from this season.
+    server_id: int | None
+        Only count the instances caught in this server.
+    since: datetime | None
+        Only count the instances caught after this date.
+
+    Returns
+    -------
+    CollectionStatistics
+        The counts, all zero if nothing matches.
+    """
+    conditions = ["NOT deleted"]
+    values: list = []
+    for condition, value in (
+        ("player_id = ${}", player.pk if player else None),
+        ("ball_id = ${}", ball.pk if ball else None),
+        ("ball_id IN (SELECT id FROM ball WHERE season = ${})", season),
+        ("server_id = ${}", server_id),
+        ("catch_date >= ${}", since),
+    ):
+        if value is not None:
+            values.append(value.value if isinstance(value, BallSeasons) else value)
+            conditions.append(condition.format(len(values)))
+
+    _, rows = await Tortoise.get_connection("default").execute_query(
+        STATISTICS_QUERY.format(conditions=" AND ".join(conditions)), values
+    )
+    statistics = CollectionStatistics()
+    for row in rows:
+        if row["overall"]:
+            statistics.total = row["total"]
+            statistics.caught = row["caught"]
+            statistics.traded = row["traded"]
+            statistics.packed = row["packed"]
+            statistics.collectibles = row["collectibles"]
+            statistics.servers = row["servers"]
+            statistics.players = row["players"]
+        elif row["special_id"] is not None:
+            statistics.specials[row["special_id"]] = row["total"]
+    return statistics
@@ -1,9 +1,12 @@
-import random
-from typing import TYPE_CHECKING, Union
+import math
+import time
+from bisect import bisect
+from typing import TYPE_CHECKING, Iterable, Sequence, Union
 
 import discord
 
-from ballsdex.core.models import Ball, Player, PrivacyPolicy, balls
+from ballsdex.core.models import Ball, BallSeasons, Player, PrivacyPolicy, Special, balls
+from ballsdex.core.utils.sampler import WeightedSampler
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -20,15 +23,134 @@ def is_staff(interaction: discord.Interaction["BallsDexBot"]) -> bool:
     return False
 
 
-def decide_collectible() -> Ball:
-    countryballs = list(filter(lambda m: m.enabled, balls.values()))
+# rebuilt by `build_collectible_samplers`, the `None` key holds every enabled collectible
+collectible_samplers: dict[BallSeasons | None, WeightedSampler[Ball]] = {}
 
-    if not countryballs:
+
+def build_collectible_samplers():
+    """
+    Rebuild the samplers used by `decide_collectible` from the `balls` cache. This must be
+    called after the cache is loaded.
+    """
+    enabled = [x for x in balls.values() if x.enabled]
+    samplers: dict[BallSeasons | None, WeightedSampler[Ball]] = {
+        None: WeightedSampler(enabled, (x.rarity for x in enabled))
+    }
+    for season in BallSeasons:
+        population = [x for x in enabled if x.season == season]
+        samplers[season] = WeightedSampler(population, (x.rarity for x in population))
+    collectible_samplers.clear()
+    collectible_samplers.update(samplers)
+
+
+def decide_collectibles(
+    k: int = 1,
+    *,
+    season: BallSeasons | None = None,
+    population: Sequence[Ball] | None = None,
+) -> list[Ball]:
+    """
+    Draw random collectibles, taking their rarity into account.
+
+    Parameters
+    ----------
+    k: int
+        The number of collectibles to draw, with replacement.
+    season: BallSeasons | None
+        Only draw enabled collectibles of this season.
+    population: Sequence[Ball] | None
+        Only draw from these collectibles, enabled or not. Use this for small, custom pools
+        such as the collectibles specified by a pack.
+    """
+    if population is not None:
+        sampler = WeightedSampler(population, (x.rarity for x in population))
+    else:
+        if not collectible_samplers:
+            build_collectible_samplers()
+        sampler = collectible_samplers[season]
+
+    if not sampler:
         raise RuntimeError(f"No {settings.collectible_name} found")
+    return sampler.sample(k)
+
+
+def decide_collectible(*, season: BallSeasons | None = None) -> Ball:
+    """
+    Draw a random enabled collectible, taking its rarity into account.
+    """
+    if not collectible_samplers:
+        build_collectible_samplers()
+    sampler = collectible_samplers[season]
+    if not sampler:
+        raise RuntimeError(f"No {settings.collectible_name} found")
+    return sampler.choice()
+
+
+class SpecialSchedule:
+    """
+    The specials sorted by their start and end dates, to draw a random special among the
+    active ones.
+
+    The sampler of the active specials is kept until the next start or end date passes, so
+    most draws do not look at the specials at all.
+    """
+
+    __slots__ = ("specials", "boundaries", "sampler", "valid_from", "valid_until")
+
+    def __init__(self):
+        self.specials: list[tuple[float, float, Special]] = []
+        self.boundaries: list[float] = []
+        self.sampler: WeightedSampler[Special | None] = WeightedSampler((), ())
+        # the sampler is valid for valid_from <= timestamp < valid_until
+        self.valid_from = math.inf
+        self.valid_until = -math.inf
+
+    def rebuild(self, specials: Iterable[Special]):
+        """
+        Replace the scheduled specials, this must be called after the cache is loaded.
+        """
+        self.specials = sorted(
+            (
+                (
+                    x.start_date.timestamp() if x.start_date else -math.inf,
+                    # end dates are inclusive, they stop applying right after
+                    math.nextafter(x.end_date.timestamp(), math.inf) if x.end_date else math.inf,
+                    x,
+                )
+                for x in specials
+            ),
+            key=lambda x: x[:2],
+        )
+        self.boundaries = sorted({y for x in self.specials for y in x[:2] if math.isfinite(y)})
+        self.valid_from = math.inf
+        self.valid_until = -math.inf
+
+    def active(self, timestamp: float) -> WeightedSampler[Special | None]:
+        """
+        Return the sampler of the specials active at the given time. `None` stands for the
+        common collectible, with the remaining weight.
+        """
+        if self.valid_from <= timestamp < self.valid_until:
+            return self.sampler
+        population = [x for start, end, x in self.specials if start <= timestamp < end]
+        common_weight = max(0, 1 - sum(x.rarity for x in population))
+        self.sampler = WeightedSampler(
+            [*population, None], [*(x.rarity for x in population), common_weight]
+        )
+        index = bisect(self.boundaries, timestamp)
+        self.valid_from = self.boundaries[index - 1] if index > 0 else -math.inf
+        self.valid_until = self.boundaries[index] if index < len(self.boundaries) else math.inf
+        return self.sampler
+
+    def get_random(self, timestamp: float | None = None) -> Special | None:
+        """
+        Draw a random special among the ones active at the given time, defaults to now.
+        """
+        sampler = self.active(time.time() if timestamp is None else timestamp)
+        return sampler.choice() if sampler else None
+
 
-    rarities = [x.rarity for x in countryballs]
-    cb = random.choices(population=countryballs, weights=rarities, k=1)[0]
-    return cb
+special_schedule = SpecialSchedule()
 
 
 async def inventory_privacy(
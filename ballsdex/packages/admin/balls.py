@@ -13,6 +13,7 @@ from tortoise.exceptions import BaseORMException, DoesNotExist
 from ballsdex.core.bot import BallsDexBot
 from ballsdex.core.models import Ball, BallInstance, Player, Special, Trade, TradeObject
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_cache
 from ballsdex.core.utils.logging import log_action
 from ballsdex.core.utils.transformers import (
     BallTransform,
@@ -20,6 +21,7 @@ from ballsdex.core.utils.transformers import (
     RegimeTransform,
     SpecialTransform,
 )
+from ballsdex.packages.admin.spawn_bomb import MAX_SPAWNS, SpawnBomb
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -53,21 +55,42 @@ class Balls(app_commands.Group):
         interaction: discord.Interaction[BallsDexBot],
         countryball_cls: type["BallSpawnView"],
         countryball: Ball | None,
-        channel: discord.TextChannel,
+        channels: list[discord.TextChannel],
         n: int,
         special: Special | None = None,
         atk_bonus: int | None = None,
         hp_bonus: int | None = None,
     ):
-        spawned = 0
+        location = channels[0].mention if len(channels) == 1 else f"{len(channels)} channels"
+        if interaction.response.is_done():
+            # replace the confirmation message
+            await interaction.followup.edit_message(
+                "@original",  # type: ignore
+                content=f"Starting spawn bomb in {location}...",
+                view=None,
+            )
+        else:
+            await interaction.response.send_message(
+                f"Starting spawn bomb in {location}...", ephemeral=True
+            )
+        bomb = SpawnBomb(
+            interaction.client,
+            countryball_cls,
+            channels,
+            n,
+            countryball,
+            special,
+            atk_bonus,
+            hp_bonus,
+        )
 
         async def update_message_loop():
             for i in range(5 * 12 * 10):  # timeout progress after 10 minutes
                 await interaction.followup.edit_message(
                     "@original",  # type: ignore
-                    content=f"Spawn bomb in progress in {channel.mention}, "
+                    content=f"Spawn bomb in progress in {location}, "
                     f"{settings.collectible_name.title()}: {countryball or 'Random'}\n"
-                    f"{spawned}/{n} spawned ({round((spawned / n) * 100)}%)",
+                    f"{bomb.progress()}",
                 )
                 await asyncio.sleep(5)
             await interaction.followup.edit_message(
@@ -75,35 +98,13 @@ class Balls(app_commands.Group):
                 content="Spawn bomb seems to have timed out.",  # type: ignore
             )
 
-        await interaction.response.send_message(
-            f"Starting spawn bomb in {channel.mention}...", ephemeral=True
-        )
         task = interaction.client.loop.create_task(update_message_loop())
         try:
-            for i in range(n):
-                if not countryball:
-                    ball = await countryball_cls.get_random(interaction.client)
-                else:
-                    ball = countryball_cls(interaction.client, countryball)
-                ball.special = special
-                ball.atk_bonus = atk_bonus
-                ball.hp_bonus = hp_bonus
-                result = await ball.spawn(channel)
-                if not result:
-                    task.cancel()
-                    await interaction.followup.edit_message(
-                        "@original",  # type: ignore
-                        content=f"A {settings.collectible_name} failed to spawn, probably "
-                        "indicating a lack of permissions to send messages "
-                        f"or upload files in {channel.mention}.",
-                    )
-                    return
-                spawned += 1
+            await bomb.run()
             task.cancel()
             await interaction.followup.edit_message(
                 "@original",  # type: ignore
-                content=f"Successfully spawned {spawned} {settings.plural_collectible_name} "
-                f"in {channel.mention}!",
+                content=bomb.summary(),
             )
         finally:
             task.cancel()
@@ -119,6 +120,7 @@ class Balls(app_commands.Group):
         special: SpecialTransform | None = None,
         atk_bonus: int | None = None,
         hp_bonus: int | None = None,
+        everywhere: bool = False,
     ):
         """
         Force spawn a random or specified countryball.
@@ -138,6 +140,10 @@ class Balls(app_commands.Group):
             Force the countryball to have a specific attack bonus when caught.
         hp_bonus: int | None
             Force the countryball to have a specific health bonus when caught.
+        everywhere: bool
+            Spawn in the spawn channel of every configured server instead, for events. The
+            number of countryballs applies to each channel. Blacklisted servers are skipped,
+            and the spawns must be confirmed first.
         """
         # the transformer triggered a response, meaning user tried an incorrect input
         if interaction.response.is_done():
@@ -158,12 +164,71 @@ class Balls(app_commands.Group):
             )
             return
 
+        if everywhere:
+            if channel:
+                await interaction.response.send_message(
+                    "You cannot give a channel when spawning everywhere.", ephemeral=True
+                )
+                return
+            channels = []
+            for guild_id, channel_id in cog.cache.items():
+                if guild_id in interaction.client.blacklist_guild:
+                    continue
+                guild = interaction.client.get_guild(guild_id)
+                spawn_channel = guild.get_channel(channel_id) if guild else None
+                if isinstance(spawn_channel, discord.TextChannel):
+                    channels.append(spawn_channel)
+            if not channels:
+                await interaction.response.send_message(
+                    "No server has a spawn channel configured.", ephemeral=True
+                )
+                return
+            total = n * len(channels)
+            if total > MAX_SPAWNS:
+                await interaction.response.send_message(
+                    f"This would spawn {total} {settings.plural_collectible_name} in "
+                    f"{len(channels)} channels, the maximum is {MAX_SPAWNS}.",
+                    ephemeral=True,
+                )
+                return
+            view = ConfirmChoiceView(
+                interaction,
+                accept_message="Confirmed, spawning...",
+                cancel_message="Request cancelled.",
+            )
+            await interaction.response.send_message(
+                f"Are you sure you want to spawn {countryball or 'random'} {n} times in "
+                f"{len(channels)} spawn channels, {total} "
+                f"{settings.plural_collectible_name} in total?",
+                view=view,
+                ephemeral=True,
+            )
+            await view.wait()
+            if not view.value:
+                return
+            await self._spawn_bomb(
+                interaction,
+                cog.countryball_cls,
+                countryball,
+                channels,
+                n,
+                special,
+                atk_bonus,
+                hp_bonus,
+            )
+            await log_action(
+                f"{interaction.user} spawned {settings.collectible_name}"
+                f" {countryball or 'random'} {n} times in {len(channels)} spawn channels.",
+                interaction.client,
+            )
+            return
+
         if n > 1:
             await self._spawn_bomb(
                 interaction,
                 cog.countryball_cls,
                 countryball,
-                channel or interaction.channel,  # type: ignore
+                [channel or interaction.channel],  # type: ignore
                 n,
                 special,
                 atk_bonus,
@@ -250,6 +315,7 @@ class Balls(app_commands.Group):
             ),
             special=special,
         )
+        interaction.client.card_renderer.prerender(instance)
         await interaction.followup.send(
             f"`{countryball.country}` {settings.collectible_name} was successfully given to "
             f"`{user}`.\nSpecial: `{special.name if special else None}` • ATK: "
@@ -387,6 +453,7 @@ class Balls(app_commands.Group):
         player, _ = await Player.get_or_create(discord_id=user.id)
         ball.player = player
         await ball.save()
+        completion_cache.invalidate([original_player.pk])
 
         trade = await Trade.create(player1=original_player, player2=player)
         await TradeObject.create(trade=trade, ballinstance=ball, player=original_player)
@@ -473,6 +540,7 @@ class Balls(app_commands.Group):
                 count = await BallInstance.filter(player=player).delete()
             else:
                 count = await BallInstance.filter(player=player).update(deleted=True)
+            completion_cache.invalidate([player.pk])
 
         await interaction.followup.send(
             f"{count} {settings.plural_collectible_name} from {user} have been deleted.",
@@ -2,7 +2,8 @@ import discord
 from discord import app_commands
 
 from ballsdex.core.bot import BallsDexBot
-from ballsdex.core.models import Player
+from ballsdex.core.counters import player_counters
+from ballsdex.core.models import CoinTransactionReason, Player
 from ballsdex.core.utils.logging import log_action
 from ballsdex.settings import settings
 
@@ -44,7 +45,7 @@ class Coins(app_commands.Group):
             return
 
         player, _ = await Player.get_or_create(discord_id=user.id)
-        await player.add_coins(amount)
+        await player.add_coins(amount, CoinTransactionReason.ADMIN)
         plural = f"{settings.currency_name}" if amount == 1 else f"{settings.plural_currency_name}"
 
         await interaction.followup.send(
@@ -83,13 +84,14 @@ class Coins(app_commands.Group):
             return
 
         player, _ = await Player.get_or_create(discord_id=user.id)
+        player_counters.merge(player)
         if amount > player.coins:
             await interaction.followup.send(
                 "You cannot remove more coins than the amount of coins the user currently has."
             )
             return
 
-        await player.remove_coins(amount)
+        await player.remove_coins(amount, CoinTransactionReason.ADMIN)
         plural = "" if amount == 1 else "s"
 
         await interaction.followup.send(
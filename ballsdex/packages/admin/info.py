@@ -3,9 +3,11 @@ import datetime
 import discord
 from discord import app_commands
 from discord.utils import format_dt
+from tortoise.timezone import now as tortoise_now
 
 from ballsdex.core.bot import BallsDexBot
-from ballsdex.core.models import BallInstance, GuildConfig, Player
+from ballsdex.core.counters import player_counters
+from ballsdex.core.models import GuildConfig, Player
 from ballsdex.core.utils.enums import (
     DONATION_POLICY_MAP,
     FRIEND_POLICY_MAP,
@@ -13,6 +15,7 @@ from ballsdex.core.utils.enums import (
     PRIVATE_POLICY_MAP,
 )
 from ballsdex.core.utils.enums import TRADE_COOLDOWN_POLICY_MAP as TRADE_POLICY_MAP
+from ballsdex.core.utils.statistics import collection_statistics
 from ballsdex.settings import settings
 
 
@@ -65,11 +68,9 @@ class Info(app_commands.Group):
         else:
             spawn_enabled = False
 
-        total_server_balls = await BallInstance.filter(
-            catch_date__gte=datetime.datetime.now() - datetime.timedelta(days=days),
-            server_id=guild.id,
-            deleted=False,
-        ).prefetch_related("player")
+        statistics = await collection_statistics(
+            server_id=guild.id, since=tortoise_now() - datetime.timedelta(days=days)
+        )
 
         if guild.owner_id:
             owner = await interaction.client.fetch_user(guild.owner_id)
@@ -91,11 +92,11 @@ class Info(app_commands.Group):
         embed.add_field(name="Created at:", value=format_dt(guild.created_at, style="F"))
         embed.add_field(
             name=f"{settings.plural_collectible_name.title()} caught ({days} days):",
-            value=len(total_server_balls),
+            value=statistics.total,
         )
         embed.add_field(
             name=f"Amount of users who caught\n{settings.plural_collectible_name} ({days} days):",
-            value=len(set([x.player.discord_id for x in total_server_balls])),
+            value=statistics.players,
         )
 
         if guild.icon:
@@ -126,17 +127,17 @@ class Info(app_commands.Group):
         if not player:
             await interaction.followup.send("The user you gave does not exist.", ephemeral=True)
             return
+        player_counters.merge(player)
 
         url = (
             f"{settings.admin_url}/bd_models/player/{player.pk}/change/"
             if settings.admin_url
             else None
         )
-        total_user_balls = await BallInstance.filter(
-            catch_date__gte=datetime.datetime.now() - datetime.timedelta(days=days),
-            player=player,
-            deleted=False,
+        recent = await collection_statistics(
+            player=player, since=tortoise_now() - datetime.timedelta(days=days)
         )
+        overall = await collection_statistics(player=player)
         plural = (
             f"{settings.currency_name}"
             if player.coins == 1
@@ -158,27 +159,27 @@ class Info(app_commands.Group):
 
         embed.add_field(
             name=f"{settings.plural_collectible_name.title()} caught ({days} days):",
-            value=len(total_user_balls),
+            value=recent.total,
         )
         embed.add_field(
             name=f"Unique {settings.plural_collectible_name} caught ({days} days):",
-            value=len(set([ball.countryball for ball in total_user_balls])),
+            value=recent.collectibles,
         )
         embed.add_field(
             name=f"Total servers with {settings.plural_collectible_name} caught ({days} days):",
-            value=len(set([x.server_id for x in total_user_balls])),
+            value=recent.servers,
         )
         embed.add_field(
             name=f"Total {settings.plural_collectible_name} caught:",
-            value=await BallInstance.filter(player__discord_id=user.id, deleted=False).count(),
+            value=overall.total,
         )
         embed.add_field(
             name=f"Total unique {settings.plural_collectible_name} caught:",
-            value=len(set([x.countryball for x in total_user_balls])),
+            value=overall.collectibles,
         )
         embed.add_field(
             name=f"Total servers with {settings.plural_collectible_name} caught:",
-            value=len(set([x.server_id for x in total_user_balls])),
+            value=overall.servers,
         )
         embed.add_field(
             name=f"Amount of {settings.plural_currency_name} owned:",
@@ -121,8 +121,17 @@ class Privacy(app_commands.Group):
             )
 
         if messages:
+            # only save the policies, the counters are changed atomically elsewhere
+            await player.save(
+                update_fields=(
+                    "privacy_policy",
+                    "donation_policy",
+                    "trade_cooldown_policy",
+                    "mention_policy",
+                    "friend_policy",
+                )
+            )
             await interaction.response.send_message("\n".join(messages), ephemeral=True)
-            await player.save()
         else:
             await interaction.response.send_message("No policies were updated.", ephemeral=True)
             return
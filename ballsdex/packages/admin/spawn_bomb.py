@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+import discord
+
+from ballsdex.core.models import Ball, Special
+from ballsdex.settings import settings
+
+if TYPE_CHECKING:
+    from ballsdex.core.bot import BallsDexBot
+    from ballsdex.packages.countryballs.countryball import BallSpawnView
+
+# spawns being sent at once in a single channel. discord.py queues the requests on the rate
+# limit bucket of the channel, having the next one ready hides the latency of each request
+CHANNEL_CONCURRENCY = 2
+# spawns being sent at once across all channels, well below the global rate limit
+MAX_CONCURRENCY = 25
+# maximum number of spawns of a single bomb, a few minutes at the global rate limit of 50
+# requests per second, well within the 10 minutes the progress message is updated for
+MAX_SPAWNS = 10000
+
+
+class SpawnBomb:
+    """
+    Spawn many countryballs at once, in one or several channels.
+
+    The spawns of every channel are sent concurrently, within the limits of
+    `CHANNEL_CONCURRENCY` and `MAX_CONCURRENCY`, each view being created right before it is
+    sent. If a spawn fails in a channel, usually because of missing permissions, the remaining
+    spawns of that channel are abandoned but the other channels continue.
+
+    Parameters
+    ----------
+    bot: BallsDexBot
+        The bot instance.
+    countryball_cls: type[BallSpawnView]
+        The class of the views to spawn.
+    channels: list[discord.TextChannel]
+        The channels to spawn in.
+    n: int
+        The number of spawns in each channel.
+    countryball: Ball | None
+        The countryball to spawn. Random for every spawn if not given.
+    special: Special | None
+        Force the special of the spawned countryballs.
+    atk_bonus: int | None
+        Force the attack bonus of the spawned countryballs.
+    hp_bonus: int | None
+        Force the health bonus of the spawned countryballs.
+    """
+
+    def __init__(
+        self,
+        bot: "BallsDexBot",
+        countryball_cls: type["BallSpawnView"],
+        channels: list[discord.TextChannel],
+        n: int,
+        countryball: Ball | None = None,
+        special: Special | None = None,
+        atk_bonus: int | None = None,
+        hp_bonus: int | None = None,
+    ):
+        self.bot = bot
+        self.countryball_cls = countryball_cls
+        self.channels = channels
+        self.n = n
+        self.countryball = countryball
+        self.special = special
+        self.atk_bonus = atk_bonus
+        self.hp_bonus = hp_bonus
+        self.total = n * len(channels)
+        self.spawned = 0
+        self.failed_channels: list[discord.TextChannel] = []
+        self.start: float | None = None
+        self.end: float | None = None
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def _make_view(self) -> "BallSpawnView":
+        if self.countryball:
+            view = self.countryball_cls(self.bot, self.countryball)
+        else:
+            view = await self.countryball_cls.get_random(self.bot)
+        view.special = self.special
+        view.atk_bonus = self.atk_bonus
+        view.hp_bonus = self.hp_bonus
+        return view
+
+    @property
+    def elapsed(self) -> float:
+        if self.start is None:
+            return 0
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def throughput(self) -> float:
+        """
+        Number of spawns sent per second.
+        """
+        elapsed = self.elapsed
+        return self.spawned / elapsed if elapsed else 0
+
+    def progress(self) -> str:
+        text = (
+            f"{self.spawned}/{self.total} spawned ({round(self.spawned / self.total * 100)}%), "
+            f"{self.throughput:.1f}/s"
+        )
+        if failed := len(self.failed_channels):
+            text += f", failed in {failed} channel{'' if failed == 1 else 's'}"
+        return text
+
+    async def _spawn_channel(self, channel: discord.TextChannel):
+        channel_semaphore = asyncio.Semaphore(CHANNEL_CONCURRENCY)
+        failed = False
+
+        async def spawn():
+            nonlocal failed
+            async with channel_semaphore, self.semaphore:
+                if failed:
+                    return
+                view = await self._make_view()
+                if await view.spawn(channel):
+                    self.spawned += 1
+                elif not failed:
+                    failed = True
+                    self.failed_channels.append(channel)
+
+        await asyncio.gather(*(spawn() for _ in range(self.n)))
+
+    async def run(self):
+        self.start = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._spawn_channel(x) for x in self.channels))
+        finally:
+            self.end = time.perf_counter()
+
+    def summary(self) -> str:
+        channels = len(self.channels) - len(self.failed_channels)
+        text = (
+            f"Spawned {self.spawned} {settings.plural_collectible_name} in {channels} "
+            f"channel{'' if channels == 1 else 's'} "
+            f"({self.elapsed:.1f}s, {self.throughput:.1f}/s)."
+        )
+        if failed := len(self.failed_channels):
+            text += (
+                f"\nSpawning failed in {failed} channel{'' if failed == 1 else 's'}, probably "
+                "indicating a lack of permissions to send messages or upload files: "
+                + ", ".join(x.mention for x in self.failed_channels[:20])
+            )
+            if len(self.failed_channels) > 20:
+                text += f" and {len(self.failed_channels) - 20} more"
+        return text
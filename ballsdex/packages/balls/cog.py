@@ -1,6 +1,5 @@
 import enum
 import logging
-from collections import defaultdict
 from typing import TYPE_CHECKING
 
 import discord
@@ -15,14 +14,16 @@ from ballsdex.core.models import (
     BallSeasons,
     DonationPolicy,
     Player,
-    Special,
     Trade,
     TradeObject,
     balls,
+    specials,
 )
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_cache
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
 from ballsdex.core.utils.sorting import FilteringChoices, SortingChoices, filter_balls, sort_balls
+from ballsdex.core.utils.statistics import collection_statistics
 from ballsdex.core.utils.transformers import (
     BallEnabledTransform,
     BallInstanceTransform,
@@ -87,6 +88,7 @@ class DonationRequest(View):
         self.countryball.trade_player = self.countryball.player
         self.countryball.player = self.new_player
         await self.countryball.save()
+        completion_cache.invalidate([self.countryball.trade_player_id])
 
         trade = await Trade.create(player1=self.countryball.trade_player, player2=self.new_player)
         await TradeObject.create(
@@ -315,6 +317,8 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
 
             if await inventory_privacy(self.bot, interaction, player, user_obj) is False:
                 return
+        else:
+            player = await Player.get_or_none(discord_id=user_obj.id)
 
         bot_countryballs = {
             x: y.emoji_id
@@ -327,17 +331,6 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
         }
 
-        filters = {"player__discord_id": user_obj.id, "deleted": False}
-
-        if not all and season is None:
-            filters["ball__enabled"] = True
-
-        if season is not None and not all:
-            filters["ball__season"] = season
-
-        if special:
-            filters["special"] = special
-
         if not bot_countryballs:
             await interaction.followup.send(
                 f"There are no {extra_text}{settings.plural_collectible_name}"
@@ -346,12 +339,14 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        owned_countryballs = set(
-            x[0]
-            for x in await BallInstance.filter(**filters)
-            .distinct()  # Do not query everything
-            .values_list("ball_id")
-        )
+        completion = await completion_cache.get(player) if player else None
+        owned_countryballs = {
+            x
+            for x in (completion.ball_ids(special.pk if special else None) if completion else ())
+            if (ball := balls.get(x))
+            and (all or season is not None or ball.enabled)
+            and (all or season is None or ball.season == season.value)
+        }
 
         entries: list[tuple[str, str]] = []
 
@@ -696,6 +691,7 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
         countryball.trade_player = old_player
         countryball.favorite = False
         await countryball.save()
+        completion_cache.invalidate([old_player.pk])
 
         trade = await Trade.create(player1=old_player, player2=new_player)
         await TradeObject.create(trade=trade, ballinstance=countryball, player=old_player)
@@ -1050,17 +1046,9 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
             )
             return
 
-        query = BallInstance.filter(player=player, deleted=False).prefetch_related(
-            "player", "trade_player", "special"
-        )
-        if countryball:
-            query = query.filter(ball=countryball, deleted=False)
-        if season:
-            query = query.filter(ball__season=season)
+        statistics = await collection_statistics(player=player, ball=countryball, season=season)
 
-        balls = await query
-
-        if not balls:
+        if not statistics.total:
             if countryball:
                 await interaction.followup.send(
                     f"You don't have any {countryball.country} "
@@ -1077,27 +1065,19 @@ class Balls(commands.GroupCog, group_name=settings.players_group_cog_name):
                 )
             return
 
-        total = len(balls)
-        total_traded = len([x for x in balls if x.trade_player])
-        total_packed = len([x for x in balls if x.packed and not x.trade_player])
-        total_caught_self = len([x for x in balls if not x.trade_player and not x.packed])
-        special_count = len([x for x in balls if x.special])
-        specials = defaultdict(int)
-        all_specials = await Special.filter(hidden=False)
-        special_emojis = {x.name: x.emoji for x in all_specials}
-        for ball in balls:
-            if ball.special:
-                specials[ball.special] += 1
-
         desc = (
-            f"**Total**: {total:,} ({total_caught_self:,} caught, "
-            f"{total_traded:,} received from trade, {total_packed:,} packed)\n"
-            f"**Total Specials**: {special_count:,}\n\n"
+            f"**Total**: {statistics.total:,} ({statistics.caught:,} caught, "
+            f"{statistics.traded:,} received from trade, {statistics.packed:,} packed)\n"
+            f"**Total Specials**: {statistics.special:,}\n\n"
         )
-        if specials:
+        if statistics.specials:
             desc += "**Specials**:\n"
-        for special, count in sorted(specials.items(), key=lambda x: x[1], reverse=True):
-            emoji = special_emojis.get(special.name, "")
+        for special_id, count in sorted(
+            statistics.specials.items(), key=lambda x: x[1], reverse=True
+        ):
+            if not (special := specials.get(special_id)):
+                continue
+            emoji = "" if special.hidden else special.emoji
             desc += f"{emoji} {special.name}: {count:,}\n"
 
         season_mapping = {
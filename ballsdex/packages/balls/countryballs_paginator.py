@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, List
 
 import discord
 
+from ballsdex.core.image_generator.image_gen import PROFILES
 from ballsdex.core.models import BallInstance
 from ballsdex.core.utils import menus
 from ballsdex.core.utils.paginator import Pages
@@ -72,7 +73,10 @@ class CountryballsViewer(CountryballsSelector):
     async def ball_selected(
         self, interaction: discord.Interaction["BallsDexBot"], ball_instance: BallInstance
     ):
-        content, file, view = await ball_instance.prepare_for_message(interaction)
+        # browsing many cards in a row, no need for the full resolution
+        content, file, view = await ball_instance.prepare_for_message(
+            interaction, PROFILES["standard"]
+        )
         await interaction.followup.send(content=content, file=file, view=view)
         file.close()
 
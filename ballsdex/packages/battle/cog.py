@@ -9,6 +9,7 @@ from discord import app_commands
 from discord.ext import commands, tasks
 from discord.utils import MISSING
 
+from ballsdex.core.counters import player_counters
 from ballsdex.core.models import Player
 from ballsdex.core.utils.transformers import (
     BallInstanceTransform,
@@ -138,6 +139,8 @@ class Battle(commands.GroupCog):
 
         player1, _ = await Player.get_or_create(discord_id=interaction.user.id)
         player2, _ = await Player.get_or_create(discord_id=user.id)
+        player_counters.merge(player1)
+        player_counters.merge(player2)
 
         if wage is not None and (wage > player1.coins or wage > player2.coins):
             await interaction.response.send_message(
@@ -301,7 +304,9 @@ class BattleResetCog(commands.Cog):
 
     @tasks.loop(hours=24)
     async def reset_battles_at_midnight(self):
-        await Player.all().update(trades_today=0)
+        # the pending battles of yesterday must not be counted after the reset
+        await player_counters.flush()
+        await Player.all().update(battles_today=0)
 
     @reset_battles_at_midnight.before_loop
     async def before_reset(self):
@@ -9,7 +9,13 @@ from typing import TYPE_CHECKING, cast
 import discord
 from discord.ui import Button, View, button
 
-from ballsdex.core.models import BallInstance, Special
+from ballsdex.core.models import (
+    BallInstance,
+    CoinTransaction,
+    CoinTransactionReason,
+    Player,
+    Special,
+)
 from ballsdex.packages.battle.battle_user import BattlingUser
 from ballsdex.packages.battle.display import fill_battle_embed_fields
 from ballsdex.settings import settings
@@ -257,9 +263,9 @@ class BattleMenu:
             await countryball.unlock()
 
         if self.wage and self.battler1.locked:
-            await self.battler1.player.add_coins(self.wage)
+            await self.battler1.player.add_coins(self.wage, CoinTransactionReason.BATTLE)
         if self.wage and self.battler2.locked:
-            await self.battler2.player.add_coins(self.wage)
+            await self.battler2.player.add_coins(self.wage, CoinTransactionReason.BATTLE)
 
         self.current_view.stop()
         for item in self.current_view.children:
@@ -281,8 +287,10 @@ class BattleMenu:
             fill_battle_embed_fields(self.embed, self.bot, self.battler1, self.battler2)
 
             if self.wage:
-                await self.battler1.player.remove_coins(self.wage)
-                await self.battler2.player.remove_coins(self.wage)
+                await CoinTransaction.apply(
+                    [(self.battler1.player, -self.wage), (self.battler2.player, -self.wage)],
+                    CoinTransactionReason.BATTLE,
+                )
 
             self.embed.colour = discord.Colour.yellow()
             self.embed.description = (
@@ -347,32 +355,22 @@ class BattleMenu:
         winner = None
         if worl1 > worl2:
             winner = self.battler1
-            if self.wage:
-                await winner.player.add_coins(self.wage * 2)
         elif worl2 > worl1:
             winner = self.battler2
+
+        max_battles = settings.max_profitable_battles_per_day
+        rewards: list[tuple[Player, int]] = []
+        if winner is not None:
             if self.wage:
-                await winner.player.add_coins(self.wage * 2)
-        elif worl1 == worl2:
-            if self.wage:
-                await self.battler1.player.add_coins(self.wage)
-                await self.battler2.player.add_coins(self.wage)
-
-        if (
-            winner == self.battler1
-            and self.battler1.player.battles_today < settings.max_profitable_battles_per_day
-        ):
-            await self.battler1.player.add_coins(10)
-        elif (
-            winner == self.battler2
-            and self.battler2.player.battles_today < settings.max_profitable_battles_per_day
-        ):
-            await self.battler2.player.add_coins(10)
-        elif winner is None:
-            if self.battler1.player.battles_today < settings.max_profitable_battles_per_day:
-                await self.battler1.player.add_coins(5)
-            if self.battler2.player.battles_today < settings.max_profitable_battles_per_day:
-                await self.battler2.player.add_coins(5)
+                rewards.append((winner.player, self.wage * 2))
+            if winner.player.battles_today < max_battles:
+                rewards.append((winner.player, 10))
+        else:
+            for battling_user in (self.battler1, self.battler2):
+                if self.wage:
+                    rewards.append((battling_user.player, self.wage))
+                if battling_user.player.battles_today < max_battles:
+                    rewards.append((battling_user.player, 5))
 
         battler.accepted = True
         fill_battle_embed_fields(self.embed, self.bot, self.battler1, self.battler2)
@@ -381,6 +379,11 @@ class BattleMenu:
             if self.task and not self.task.cancelled():
                 self.task.cancel()
 
+            # the wages and rewards of both players in a single statement
+            await CoinTransaction.apply(rewards, CoinTransactionReason.BATTLE, buffered=True)
+            await self.battler1.player.add_activity(battles=1)
+            await self.battler2.player.add_activity(battles=1)
+
             if winner is None:
                 self.embed.description = (
                     "This battle has ended in a draw. Use stronger "
@@ -398,9 +401,4 @@ class BattleMenu:
 
         await self.message.edit(content=None, embed=self.embed, view=self.current_view)
 
-        self.battler1.player.battles_today += 1
-        self.battler2.player.battles_today += 1
-        await self.battler1.player.save()
-        await self.battler2.player.save()
-
         return True
@@ -1,4 +1,5 @@
 import logging
+import struct
 from typing import TYPE_CHECKING, Literal
 
 from ballsdex.packages.countryballs.spawn import BaseSpawnManager
@@ -60,6 +61,24 @@ class ABSpawner(BaseSpawnManager):
         else:
             return self.manager_b
 
+    def snapshot(self) -> bytes | None:
+        state_a = self.manager_a.snapshot() or b""
+        state_b = self.manager_b.snapshot() or b""
+        if not state_a and not state_b:
+            return None
+        return struct.pack("=I", len(state_a)) + state_a + state_b
+
+    def restore(self, data: bytes):
+        try:
+            (length,) = struct.unpack_from("=I", data)
+        except struct.error:
+            log.warning("Could not restore the A/B spawn manager state", exc_info=True)
+            return
+        if state_a := data[4 : 4 + length]:
+            self.manager_a.restore(state_a)
+        if state_b := data[4 + length :]:
+            self.manager_b.restore(state_b)
+
     async def handle_message(self, message: "discord.Message") -> bool | tuple[Literal[True], str]:
         assert message.guild
         manager = self.get_manager(message.guild)
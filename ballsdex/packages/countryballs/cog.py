@@ -1,14 +1,18 @@
+import asyncio
 import importlib
 import logging
+import os
+from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from tortoise.exceptions import DoesNotExist
 
-from ballsdex.core.models import GuildConfig
+from ballsdex.core.models import GuildConfig, balls
 from ballsdex.packages.countryballs.countryball import BallSpawnView
 from ballsdex.packages.countryballs.spawn import BaseSpawnManager
+from ballsdex.packages.countryballs.wild_cards import wild_card_cache
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -31,6 +35,8 @@ class CountryBallsSpawner(commands.Cog):
         importlib.reload(module)
         spawn_manager = getattr(module, class_name)
         self.spawn_manager = spawn_manager(bot)
+        # only warn once if the state cannot be written, instead of on every save
+        self.spawn_state_failed = False
 
     async def load_cache(self):
         i = 0
@@ -42,6 +48,68 @@ class CountryBallsSpawner(commands.Cog):
         grammar = "" if i == 1 else "s"
         log.info(f"Loaded {i} guild{grammar} in cache.")
 
+        await wild_card_cache.preload(
+            ["./admin_panel/media/" + x.wild_card for x in balls.values() if x.enabled]
+        )
+
+        await self.restore_spawn_state()
+        self.save_spawn_state.start()
+
+    async def cog_unload(self):
+        # not running if the state was never restored, do not overwrite it
+        if self.save_spawn_state.is_running():
+            self.save_spawn_state.cancel()
+            await self.write_spawn_state()
+
+    async def restore_spawn_state(self):
+        if not settings.spawn_manager_state:
+            return
+        path = Path(settings.spawn_manager_state)
+        try:
+            content = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return
+        except OSError:
+            log.warning(f"Could not read the spawn manager state from {path}", exc_info=True)
+            return
+        # the state is only valid for the manager that wrote it
+        manager, _, data = content.partition(b"\n")
+        if manager.decode(errors="replace") != settings.spawn_manager:
+            log.info("Spawn manager changed, ignoring its saved state.")
+            return
+        self.spawn_manager.restore(data)
+
+    async def write_spawn_state(self):
+        if not settings.spawn_manager_state:
+            return
+        data = self.spawn_manager.snapshot()
+        if data is None:
+            return
+        path = Path(settings.spawn_manager_state)
+
+        def write():
+            # write then rename, so that a crash never leaves a partial file
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(settings.spawn_manager.encode() + b"\n" + data)
+            os.replace(tmp, path)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError:
+            if not self.spawn_state_failed:
+                log.warning(
+                    f"Could not write the spawn manager state to {path}, check that the "
+                    "directory is writable or disable spawn-manager-state",
+                    exc_info=True,
+                )
+            self.spawn_state_failed = True
+        else:
+            self.spawn_state_failed = False
+
+    @tasks.loop(minutes=5)
+    async def save_spawn_state(self):
+        await self.write_spawn_state()
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or message.webhook_id is not None:
@@ -4,32 +4,88 @@ import logging
 import math
 import random
 import string
-from datetime import datetime
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ui import Button, Modal, TextInput, View, button
-from tortoise.timezone import get_default_timezone
+from tortoise import Tortoise
 from tortoise.timezone import now as tortoise_now
+from tortoise.transactions import in_transaction
 
+from ballsdex.core.counters import player_counters
 from ballsdex.core.metrics import caught_balls
 from ballsdex.core.models import (
     Ball,
     BallInstance,
+    CoinTransaction,
+    CoinTransactionReason,
     Player,
     Special,
     Trade,
     TradeObject,
-    specials,
 )
-from ballsdex.core.utils.utils import decide_collectible
+from ballsdex.core.utils.completion import completion_cache
+from ballsdex.core.utils.names import catch_name_index
+from ballsdex.core.utils.utils import decide_collectible, special_schedule
+from ballsdex.packages.countryballs.wild_cards import wild_card_cache
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+
     from ballsdex.core.bot import BallsDexBot
 
 log = logging.getLogger("ballsdex.packages.countryballs")
 
+# Create the instance, check if the player already had this countryball and give the coins
+# (recorded in the ledger) in a single statement. Every part of a statement sees the same
+# snapshot of the database, so the new instance is not counted when checking if the player
+# already had the countryball. The player is left untouched if there are no coins to give.
+# The new balance is not returned, the loaded `Player` is not updated with it.
+# $1 is the player ID, $2 the ball ID, $3 the coins and $4 the reason, the columns of the
+# instance follow and are filled by `catch_query`.
+CATCH_QUERY = """
+WITH instance AS (
+    INSERT INTO ballinstance ({columns}) VALUES ({values}) RETURNING id
+), wallet AS (
+    UPDATE player SET coins = coins + $3 WHERE id = $1 AND $3 <> 0 RETURNING coins
+), ledger AS (
+    INSERT INTO cointransaction (player_id, amount, balance, reason, date)
+    SELECT $1, $3, coins, $4::smallint, now() FROM wallet
+)
+SELECT
+    instance.id,
+    EXISTS(
+        SELECT 1 FROM ballinstance WHERE player_id = $1 AND ball_id = $2 AND NOT deleted
+    ) AS caught_before
+FROM instance
+"""
+
+
+def catch_query(
+    connection: BaseDBAsyncClient, instance: BallInstance, coins: int
+) -> tuple[str, list]:
+    """
+    Return `CATCH_QUERY` and its values for inserting this instance. The columns and their
+    values come from the executor of the ORM, like `save()`, so that every field and its
+    default is written.
+    """
+    executor = connection.executor_class(model=BallInstance, db=connection)
+    projection = BallInstance._meta.fields_db_projection
+    field_names = executor.regular_columns
+    query = CATCH_QUERY.format(
+        columns=", ".join(f'"{projection[x]}"' for x in field_names),
+        values=", ".join(f"${i}" for i in range(5, len(field_names) + 5)),
+    )
+    values = [
+        instance.player_id,
+        instance.ball_id,
+        coins,
+        CoinTransactionReason.CATCH.value,
+        *(executor.column_map[x](getattr(instance, x), instance) for x in field_names),
+    ]
+    return query, values
+
 
 def amount_from_rarity(rarity: float) -> int:
     rarity_min = 0.03
@@ -116,15 +172,10 @@ class CountryballNamePrompt(Modal, title=f"Catch this {settings.collectible_name
             interaction.user, player=player, guild=interaction.guild
         )
 
-        amount = amount_from_rarity(self.ball.rarity)
-        if ball.special:
-            amount += special_bonus_from_rarity(ball.special.rarity)
-
         await interaction.followup.send(
             self.view.get_catch_message(ball, has_caught_before, interaction.user.mention),
             allowed_mentions=discord.AllowedMentions(users=player.can_be_mentioned),
         )
-        await player.add_coins(amount)
         await interaction.followup.edit_message(self.view.message.id, view=self.view)
 
 
@@ -222,30 +273,7 @@ class BallSpawnView(View):
         return self.model.country
 
     def get_random_special(self) -> Special | None:
-        population = [
-            x
-            for x in specials.values()
-            # handle null start/end dates with infinity times
-            if (x.start_date or datetime.min.replace(tzinfo=get_default_timezone()))
-            <= tortoise_now()
-            <= (x.end_date or datetime.max.replace(tzinfo=get_default_timezone()))
-        ]
-
-        if not population:
-            return None
-
-        common_weight: float = 1 - sum(x.rarity for x in population)
-
-        if common_weight < 0:
-            common_weight = 0
-
-        weights = [x.rarity for x in population] + [common_weight]
-        # None is added representing the common countryball
-        special: Special | None = random.choices(
-            population=population + [None], weights=weights, k=1
-        )[0]
-
-        return special
+        return special_schedule.get_random()
 
     async def spawn(self, channel: discord.TextChannel) -> bool:
         """
@@ -283,7 +311,7 @@ class BallSpawnView(View):
                 self.message = await channel.send(
                     spawn_message,
                     view=self,
-                    file=discord.File(file_location, filename=file_name),
+                    file=discord.File(wild_card_cache.open(file_location), filename=file_name),
                 )
                 return True
             else:
@@ -301,27 +329,14 @@ class BallSpawnView(View):
         Parameters
         ----------
         text: str
-            The text entered by the user. It will be lowered and stripped of enclosing blank
-            characters.
+            The text entered by the user. The case, quotes and blank characters are normalized.
 
         Returns
         -------
         bool
             Whether the name matches or not.
         """
-        if self.model.catch_names:
-            possible_names = (self.name.lower(), *self.model.catch_names.split(";"))
-        else:
-            possible_names = (self.name.lower(),)
-        if self.model.translations:
-            possible_names += tuple(x.lower() for x in self.model.translations.split(";"))
-        cname = text.lower().strip()
-        # Remove fancy unicode characters like ’ to replace to '
-        cname = cname.replace("\u2019", "'")
-        cname = cname.replace("\u2018", "'")
-        cname = cname.replace("\u201c", '"')
-        cname = cname.replace("\u201d", '"')
-        return cname in possible_names
+        return catch_name_index.matches(self.model, text)
 
     async def catch_ball(
         self,
@@ -332,7 +347,11 @@ class BallSpawnView(View):
     ) -> tuple[BallInstance, bool]:
         """
         Mark this countryball as caught and assign a new `BallInstance` (or transfer ownership if
-        attribute `ballinstance` was set).
+        attribute `ballinstance` was set), then give the player the coins earned.
+
+        All database changes are made in a single transaction, and a new instance is created in
+        a single statement. Its coins are only written to the database (or buffered), the
+        given `Player` object is left untouched.
 
         Parameters
         ----------
@@ -364,21 +383,34 @@ class BallSpawnView(View):
         self.caught = True
         self.catch_button.disabled = True
         player = player or (await Player.get_or_create(discord_id=user.id))[0]
-        is_new = not await BallInstance.filter(
-            player=player, ball=self.model, deleted=False
-        ).exists()
 
         if self.ballinstance:
             # if specified, do not create a countryball but switch owner
             # it's important to register this as a trade to avoid bypass
-            trade = await Trade.create(player1=self.ballinstance.player, player2=player)
-            await TradeObject.create(
-                trade=trade, player=self.ballinstance.player, ballinstance=self.ballinstance
-            )
-            self.ballinstance.trade_player = self.ballinstance.player
-            self.ballinstance.player = player
-            self.ballinstance.locked = None  # type: ignore
-            await self.ballinstance.save(update_fields=("player", "trade_player", "locked"))
+            amount = self.get_coins_amount(self.ballinstance)
+            previous_owner = self.ballinstance.player_id
+            async with in_transaction() as connection:
+                if (completion := completion_cache.peek(player.pk)) is not None:
+                    is_new = not completion.has(self.model.pk)
+                else:
+                    is_new = not await BallInstance.filter(
+                        player=player, ball=self.model, deleted=False
+                    ).exists()
+                trade = await Trade.create(player1=self.ballinstance.player, player2=player)
+                await TradeObject.create(
+                    trade=trade, player=self.ballinstance.player, ballinstance=self.ballinstance
+                )
+                self.ballinstance.trade_player = self.ballinstance.player
+                self.ballinstance.player = player
+                self.ballinstance.locked = None  # type: ignore
+                await self.ballinstance.save(update_fields=("player", "trade_player", "locked"))
+                await CoinTransaction.apply(
+                    [(player, amount)],
+                    CoinTransactionReason.CATCH,
+                    buffered=True,
+                    using_db=connection,
+                )
+            completion_cache.invalidate([previous_owner])
             return self.ballinstance, is_new
 
         # stat may vary by +/- 20% of base stat
@@ -399,7 +431,7 @@ class BallSpawnView(View):
         if not special:
             special = self.get_random_special()
 
-        ball = await BallInstance.create(
+        ball = BallInstance(
             ball=self.model,
             player=player,
             special=special,
@@ -407,7 +439,26 @@ class BallSpawnView(View):
             health_bonus=bonus_health,
             server_id=guild.id if guild else None,
             spawned_time=self.message.created_at,
+            catch_date=tortoise_now(),
         )
+        coins = self.get_coins_amount(ball)
+        # when buffered, the statement leaves the coins out and they are added afterwards
+        buffered = player_counters.enabled
+        # prefer the cached completion of the player, read before the catch is added to it
+        completion = completion_cache.peek(player.pk)
+        is_new = not completion.has(self.model.pk) if completion is not None else None
+        connection = Tortoise.get_connection("default")
+        _, rows = await connection.execute_query(
+            *catch_query(connection, ball, 0 if buffered else coins)
+        )
+        ball.id = rows[0]["id"]
+        ball._saved_in_db = True
+        if buffered:
+            await player_counters.add(player.pk, coins=coins, reason=CoinTransactionReason.CATCH)
+        if is_new is None:
+            is_new = not rows[0]["caught_before"]
+        completion_cache.add(player.pk, self.model.pk, special.pk if special else None)
+        self.bot.card_renderer.prerender(ball)
 
         # logging and stats
         log.log(
@@ -425,6 +476,15 @@ class BallSpawnView(View):
 
         return ball, is_new
 
+    def get_coins_amount(self, ball: BallInstance) -> int:
+        """
+        Return the number of coins earned by catching this countryball.
+        """
+        amount = amount_from_rarity(ball.countryball.rarity)
+        if ball.specialcard:
+            amount += special_bonus_from_rarity(ball.specialcard.rarity)
+        return amount
+
     def get_catch_message(self, ball: BallInstance, new_ball: bool, mention: str) -> str:
         """
         Generate a user-facing message after a ball has been caught.
@@ -456,11 +516,7 @@ class BallSpawnView(View):
             + " "
         )
 
-        amount = amount_from_rarity(ball.ball.rarity)
-        if ball.special:
-            amount += special_bonus_from_rarity(ball.special.rarity)
-
         return caught_message + (
             f"`(#{ball.pk:0X}, {ball.attack_bonus:+}%/{ball.health_bonus:+}%)` "
-            f"**(+{amount} {settings.currency_emoji})**\n\n{text}"
+            f"**(+{self.get_coins_amount(ball)} {settings.currency_emoji})**\n\n{text}"
         )
@@ -0,0 +1,322 @@
+"""
+Offline simulator of spawn managers.
+
+Streams of messages are replayed through implementations of `BaseSpawnManager`, without
+Discord or a database. Time only advances with the timestamps of the messages, so results are
+deterministic for a given stream and seed. Run from the bot's directory:
+
+    python3 -m ballsdex.packages.countryballs.simulator --guilds 1000 --hours 24
+
+Messages are either generated randomly, or read from a CSV file with the following columns:
+guild_id, member_count, author_id, content_length, timestamp (in seconds, in ascending order).
+
+Several managers can be given with `--manager`, they are all fed the same stream so that their
+results can be compared: number of spawns per guild-hour for each guild size, distribution of
+the intervals between two spawns in a guild, and CPU time spent per message.
+"""
+
+import argparse
+import asyncio
+import csv
+import heapq
+import importlib
+import math
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+from ballsdex.packages.countryballs import spawn
+from ballsdex.packages.countryballs.spawn import BaseSpawnManager
+from ballsdex.settings import settings
+
+if TYPE_CHECKING:
+    import discord
+
+GUILD_SIZES = ((5, "1-4"), (100, "5-99"), (1000, "100-999"), (math.inf, "1000+"))
+
+
+class MessageRecord(NamedTuple):
+    guild_id: int
+    member_count: int
+    author_id: int
+    content_length: int
+    timestamp: float
+
+
+class FakeGuild:
+    __slots__ = ("id", "member_count")
+
+    def __init__(self, id: int, member_count: int):
+        self.id = id
+        self.member_count = member_count
+
+
+class FakeAuthor:
+    __slots__ = ("id", "bot")
+
+    def __init__(self, id: int):
+        self.id = id
+        self.bot = False
+
+
+class FakeMessage:
+    """
+    The subset of `discord.Message` used by spawn managers.
+    """
+
+    __slots__ = ("guild", "author", "content", "created_at", "webhook_id", "_state")
+
+    # as if the message content intent was enabled
+    state = SimpleNamespace(intents=SimpleNamespace(message_content=True))
+
+    def __init__(self, guild: FakeGuild, record: MessageRecord):
+        self.guild = guild
+        self.author = FakeAuthor(record.author_id)
+        self.content = "x" * record.content_length
+        self.created_at = datetime.fromtimestamp(record.timestamp, timezone.utc)
+        self.webhook_id = None
+        self._state = self.state
+
+
+@dataclass
+class SimulationResult:
+    manager: str
+    messages: int = 0
+    cpu_time: float = 0
+    spawns: dict[int, list[float]] = field(default_factory=lambda: defaultdict(list))
+
+
+def guild_size(member_count: int) -> str:
+    return next(name for limit, name in GUILD_SIZES if member_count < limit)
+
+
+def generate_messages(guilds: int, hours: float, seed: int) -> Iterator[MessageRecord]:
+    """
+    Generate a random stream of messages. Guild sizes are spread logarithmically, and larger
+    guilds have more chatters and send messages more often.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    end = start + hours * 3600
+
+    members: list[int] = []
+    chatters: list[int] = []
+    # average number of seconds between two messages
+    intervals: list[float] = []
+    queue: list[tuple[float, int]] = []
+    for i in range(guilds):
+        member_count = int(10 ** rng.uniform(0.3, 5))
+        members.append(member_count)
+        chatters.append(max(1, min(member_count, int(math.sqrt(member_count) * 2))))
+        intervals.append(3600 / (10 + 20 * math.log10(member_count) ** 2) * rng.uniform(0.2, 5))
+        heapq.heappush(queue, (start + rng.expovariate(1 / intervals[i]), i))
+
+    while queue:
+        timestamp, i = heapq.heappop(queue)
+        if timestamp >= end:
+            continue
+        yield MessageRecord(
+            guild_id=i + 1,
+            member_count=members[i],
+            # some chatters are more active than others
+            author_id=int(chatters[i] * rng.random() ** 2) + 1,
+            content_length=int(rng.lognormvariate(3, 1)),
+            timestamp=timestamp,
+        )
+        heapq.heappush(queue, (timestamp + rng.expovariate(1 / intervals[i]), i))
+
+
+def read_messages(path: Path) -> Iterator[MessageRecord]:
+    with path.open(newline="") as file:
+        for row in csv.DictReader(file):
+            yield MessageRecord(
+                guild_id=int(row["guild_id"]),
+                member_count=int(row["member_count"]),
+                author_id=int(row["author_id"]),
+                content_length=int(row["content_length"]),
+                timestamp=float(row["timestamp"]),
+            )
+
+
+def load_manager(path: str) -> type[BaseSpawnManager]:
+    module_path, class_name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+async def simulate(
+    managers: dict[str, BaseSpawnManager], messages: Iterable[MessageRecord]
+) -> tuple[list[SimulationResult], dict[int, int], float]:
+    """
+    Feed the messages to every manager.
+
+    Returns
+    -------
+    tuple[list[SimulationResult], dict[int, int], float]
+        The results of each manager, the member count of each guild and the duration of the
+        stream in seconds.
+    """
+    results = {name: SimulationResult(name) for name in managers}
+    guilds: dict[int, FakeGuild] = {}
+    first: float | None = None
+    last = 0.0
+    for record in messages:
+        if first is None:
+            first = record.timestamp
+        last = record.timestamp
+        guild = guilds.get(record.guild_id)
+        if guild is None:
+            guild = guilds[record.guild_id] = FakeGuild(record.guild_id, record.member_count)
+        message: "discord.Message" = FakeMessage(guild, record)  # type: ignore
+        for name, manager in managers.items():
+            result = results[name]
+            start = time.process_time()
+            spawned = await manager.handle_message(message)
+            result.cpu_time += time.process_time() - start
+            result.messages += 1
+            if spawned is not False:
+                result.spawns[record.guild_id].append(record.timestamp)
+    duration = last - first if first is not None else 0
+    return list(results.values()), {x.id: x.member_count for x in guilds.values()}, duration
+
+
+def display_results(
+    console: Console, results: list[SimulationResult], guilds: dict[int, int], duration: float
+):
+    hours = duration / 3600
+    guilds_per_size: dict[str, int] = defaultdict(int)
+    for member_count in guilds.values():
+        guilds_per_size[guild_size(member_count)] += 1
+
+    table = Table(box=box.SIMPLE, title=f"Spawns per guild-hour ({hours:.1f} hours)")
+    table.add_column("Manager", style="cyan")
+    for _, size in GUILD_SIZES:
+        table.add_column(f"{size} ({guilds_per_size[size]})", justify="right")
+    table.add_column("All", justify="right", style="green")
+    for result in results:
+        spawns_per_size: dict[str, int] = defaultdict(int)
+        for guild_id, spawns in result.spawns.items():
+            spawns_per_size[guild_size(guilds[guild_id])] += len(spawns)
+        row = [result.manager]
+        for _, size in GUILD_SIZES:
+            guild_hours = guilds_per_size[size] * hours
+            row.append(f"{spawns_per_size[size] / guild_hours:.3f}" if guild_hours else "-")
+        total = sum(spawns_per_size.values())
+        row.append(f"{total / (len(guilds) * hours):.3f}" if guilds and hours else "-")
+        table.add_row(*row)
+    console.print(table)
+
+    table = Table(box=box.SIMPLE, title="Minutes between two spawns in a guild")
+    table.add_column("Manager", style="cyan")
+    for column in ("Count", "Min", "p10", "p50", "p90", "Max"):
+        table.add_column(column, justify="right")
+    for result in results:
+        intervals = [(b - a) / 60 for x in result.spawns.values() for a, b in zip(x, x[1:])]
+        if len(intervals) < 2:
+            table.add_row(result.manager, str(len(intervals)), "-", "-", "-", "-", "-")
+            continue
+        deciles = statistics.quantiles(intervals, n=10, method="inclusive")
+        table.add_row(
+            result.manager,
+            str(len(intervals)),
+            f"{min(intervals):.1f}",
+            f"{deciles[0]:.1f}",
+            f"{deciles[4]:.1f}",
+            f"{deciles[8]:.1f}",
+            f"{max(intervals):.1f}",
+        )
+    console.print(table)
+
+    table = Table(box=box.SIMPLE, title="Performance")
+    table.add_column("Manager", style="cyan")
+    table.add_column("Messages", justify="right")
+    table.add_column("Spawns", justify="right")
+    table.add_column("CPU per message (µs)", justify="right", style="green")
+    for result in results:
+        table.add_row(
+            result.manager,
+            str(result.messages),
+            str(sum(len(x) for x in result.spawns.values())),
+            f"{result.cpu_time / result.messages * 1e6:.2f}" if result.messages else "-",
+        )
+    console.print(table)
+
+
+def parse_arguments(arguments: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python3 -m ballsdex.packages.countryballs.simulator",
+        description="Replay messages through spawn managers and compare their results.",
+    )
+    parser.add_argument(
+        "--manager",
+        action="append",
+        help="Python path to a spawn manager class, can be repeated. "
+        "Defaults to the configured one.",
+    )
+    parser.add_argument(
+        "--input", type=Path, help="CSV file of messages to replay instead of random ones"
+    )
+    parser.add_argument(
+        "--guilds", type=int, default=1000, help="Number of guilds of the random stream"
+    )
+    parser.add_argument(
+        "--hours", type=float, default=24, help="Duration of the random stream in hours"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generators")
+    parser.add_argument(
+        "--spawn-chance-range",
+        type=int,
+        nargs=2,
+        metavar=("MIN", "MAX"),
+        help="Override SPAWN_CHANCE_RANGE of the default spawn manager",
+    )
+    parser.add_argument(
+        "--time-multipliers",
+        type=float,
+        nargs=len(spawn.TIME_MULTIPLIERS),
+        metavar="MULTIPLIER",
+        help="Override TIME_MULTIPLIERS of the default spawn manager, one for each guild size "
+        "(below 5, 100 and 1000 members, then above)",
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments: list[str]) -> int:
+    args = parse_arguments(arguments)
+    console = Console()
+    if args.spawn_chance_range:
+        spawn.SPAWN_CHANCE_RANGE = tuple(args.spawn_chance_range)
+    if args.time_multipliers:
+        spawn.TIME_MULTIPLIERS = tuple(args.time_multipliers)
+
+    managers: dict[str, BaseSpawnManager] = {}
+    for path in args.manager or [settings.spawn_manager]:
+        # the bot is not used by the built-in managers
+        name = path.rsplit(".", 1)[1]
+        if name in managers:
+            name = path
+        managers[name] = load_manager(path)(None)  # type: ignore
+
+    # thresholds are random
+    random.seed(args.seed)
+    if args.input:
+        messages = read_messages(args.input)
+    else:
+        messages = generate_messages(args.guilds, args.hours, args.seed)
+    results, guilds, duration = asyncio.run(simulate(managers, messages))
+    display_results(console, results, guilds, duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,15 +1,18 @@
-import asyncio
 import logging
 import random
+import struct
+import sys
+import zlib
 from abc import abstractmethod
-from collections import deque, namedtuple
-from dataclasses import dataclass, field
-from datetime import datetime
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Literal
 
 import discord
 from discord.utils import format_dt
 
+from ballsdex.core.metrics import spawn_manager_memory
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -18,8 +21,19 @@ if TYPE_CHECKING:
 log = logging.getLogger("ballsdex.packages.countryballs")
 
 SPAWN_CHANCE_RANGE = (40, 55)
+# the threshold is also reached with time, at a rate depending on the member count, to nuke farm
+# servers. each multiplier applies below the member count of the same index, the last one above
+MEMBER_COUNT_TIERS = (5, 100, 1000)
+TIME_MULTIPLIERS = (0.1, 0.8, 0.5, 0.2)
+MESSAGE_CACHE_SIZE = 100
+# minimum number of seconds between two messages increasing the count of a guild
+MESSAGE_COOLDOWN = 10
+# bump when the format of SpawnManager.snapshot changes, older snapshots are then ignored
+SNAPSHOT_VERSION = 1
 
-CachedMessage = namedtuple("CachedMessage", ["content", "author_id"])
+
+def get_time_multiplier(member_count: int) -> float:
+    return TIME_MULTIPLIERS[bisect_right(MEMBER_COUNT_TIERS, member_count)]
 
 
 class BaseSpawnManager:
@@ -28,7 +42,8 @@ class BaseSpawnManager:
     should be spawned. You can implement your own version and configure it in config.yml.
 
     Be careful with optimization and memory footprint, this will be called very often and should
-    not slow down the bot or cause memory leaks.
+    not slow down the bot or cause memory leaks. Implementations can be compared offline with
+    `python3 -m ballsdex.packages.countryballs.simulator`.
     """
 
     def __init__(self, bot: "BallsDexBot"):
@@ -75,13 +90,42 @@ class BaseSpawnManager:
         """
         raise NotImplementedError
 
+    def snapshot(self) -> bytes | None:
+        """
+        Serialize the state of the manager, so that it can be resumed with `restore` after a
+        restart or a reload of the package. This is invoked periodically and on shutdown.
+
+        Returns
+        -------
+        bytes | None
+            The state to save, or `None` if there is nothing to save.
+        """
+        return None
+
+    def restore(self, data: bytes):
+        """
+        Resume from a state previously returned by `snapshot`. This is invoked once, when the
+        package is loaded.
+
+        The data may have been produced by an older version of your manager, invalid or outdated
+        states should be ignored.
+
+        Parameters
+        ----------
+        data: bytes
+            The saved state.
+        """
+        pass
+
 
-@dataclass
 class SpawnCooldown:
     """
     Represents the default spawn internal system per guild. Contains the counters that will
     determine if a countryball should be spawned next or not.
 
+    One of these is kept for every active guild, so only what the algorithm needs is stored,
+    in compact structures.
+
     Attributes
     ----------
     time: datetime
@@ -92,87 +136,250 @@ class SpawnCooldown:
     threshold: int
         The number `scaled_message_count` has to reach for spawn.
         Determined randomly with `SPAWN_CHANCE_RANGE`
-    lock: asyncio.Lock
-        Used to ratelimit messages and ignore fast spam
-    message_cache: ~collections.deque[CachedMessage]
-        A list of recent messages used to reduce the spawn chance when too few different chatters
-        are present. Limited to the 100 most recent messages in the guild.
+    next_eligible: float
+        Timestamp before which messages do not increase the count, used to ratelimit messages
+        and ignore fast spam
+    author_ids: array.array[int]
+        Authors of the recent messages, used to reduce the spawn chance when too few different
+        chatters are present. Limited to the `MESSAGE_CACHE_SIZE` most recent messages in the
+        guild, once full the oldest entry is overwritten.
+    content_lengths: array.array[int]
+        Length of the recent messages, capped to 255, in the same order as `author_ids`.
+    cursor: int
+        Index of the oldest message in `author_ids` and `content_lengths` once they are full.
+    author_counts: dict[int, int]
+        Number of messages of each author within `author_ids`, updated along with it.
+    last_message: float
+        Timestamp of the last message received, used to forget idle guilds.
     """
 
-    time: datetime
-    # initialize partially started, to reduce the dead time after starting the bot
-    scaled_message_count: float = field(default=SPAWN_CHANCE_RANGE[0] // 2)
-    threshold: int = field(default_factory=lambda: random.randint(*SPAWN_CHANCE_RANGE))
-    lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
-    message_cache: deque[CachedMessage] = field(default_factory=lambda: deque(maxlen=100))
+    __slots__ = (
+        "time",
+        "scaled_message_count",
+        "threshold",
+        "next_eligible",
+        "author_ids",
+        "content_lengths",
+        "cursor",
+        "author_counts",
+        "last_message",
+    )
+
+    def __init__(
+        self,
+        time: datetime,
+        scaled_message_count: float | None = None,
+        threshold: int | None = None,
+    ):
+        self.time = time
+        if scaled_message_count is None:
+            # initialize partially started, to reduce the dead time after starting the bot
+            scaled_message_count = SPAWN_CHANCE_RANGE[0] // 2
+        self.scaled_message_count = scaled_message_count
+        if threshold is None:
+            threshold = random.randint(*SPAWN_CHANCE_RANGE)
+        self.threshold = threshold
+        self.next_eligible = 0.0
+        self.author_ids = array("Q")
+        self.content_lengths = array("B")
+        self.cursor = 0
+        self.author_counts: dict[int, int] = {}
+        self.last_message = time.timestamp()
+
+    # guild ID, time, scaled message count, threshold, next eligible time, last message time,
+    # cursor and number of cached messages, followed by the author IDs and content lengths
+    _header = struct.Struct("=QddIddHH")
+
+    def dump(self, guild_id: int) -> bytes:
+        """
+        Serialize this object for `SpawnManager.snapshot`.
+        """
+        return (
+            self._header.pack(
+                guild_id,
+                self.time.timestamp(),
+                self.scaled_message_count,
+                self.threshold,
+                self.next_eligible,
+                self.last_message,
+                self.cursor,
+                len(self.author_ids),
+            )
+            + self.author_ids.tobytes()
+            + self.content_lengths.tobytes()
+        )
+
+    @classmethod
+    def load(cls, data: memoryview, offset: int) -> tuple[int, "SpawnCooldown", int]:
+        """
+        Deserialize an object written by `dump` at the given offset.
+
+        Returns
+        -------
+        tuple[int, SpawnCooldown, int]
+            The guild ID, the object and the offset of the next one.
+        """
+        guild_id, time, count, threshold, next_eligible, last_message, cursor, length = (
+            cls._header.unpack_from(data, offset)
+        )
+        offset += cls._header.size
+        cooldown = cls(datetime.fromtimestamp(time, timezone.utc), count, threshold)
+        cooldown.next_eligible = next_eligible
+        cooldown.last_message = last_message
+        cooldown.cursor = cursor
+        end = offset + length * cooldown.author_ids.itemsize
+        cooldown.author_ids.frombytes(data[offset:end])
+        cooldown.content_lengths.frombytes(data[end : end + length])
+        if len(cooldown.content_lengths) != length:
+            raise ValueError("Truncated spawn cooldown")
+        for author_id in cooldown.author_ids:
+            cooldown.author_counts[author_id] = cooldown.author_counts.get(author_id, 0) + 1
+        return guild_id, cooldown, end + length
+
+    @property
+    def cached_messages(self) -> int:
+        return len(self.author_ids)
+
+    @property
+    def distinct_authors(self) -> int:
+        return len(self.author_counts)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by this object, in bytes.
+        """
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.time)
+            + sys.getsizeof(self.author_ids)
+            + sys.getsizeof(self.content_lengths)
+            + sys.getsizeof(self.author_counts)
+        )
+
+    def author_share(self, author_id: int) -> float:
+        """
+        Return the part of the message cache's capacity filled by messages of this author.
+        """
+        return self.author_counts.get(author_id, 0) / MESSAGE_CACHE_SIZE
+
+    def cache_message(self, message: discord.Message):
+        author_id = message.author.id
+        length = min(len(message.content), 255)
+        if len(self.author_ids) < MESSAGE_CACHE_SIZE:
+            self.author_ids.append(author_id)
+            self.content_lengths.append(length)
+        else:
+            # replace the oldest message, thus we only have the last messages in memory
+            evicted = self.author_ids[self.cursor]
+            if self.author_counts[evicted] > 1:
+                self.author_counts[evicted] -= 1
+            else:
+                del self.author_counts[evicted]
+            self.author_ids[self.cursor] = author_id
+            self.content_lengths[self.cursor] = length
+            self.cursor = (self.cursor + 1) % MESSAGE_CACHE_SIZE
+        self.author_counts[author_id] = self.author_counts.get(author_id, 0) + 1
 
     def reset(self, time: datetime):
         self.scaled_message_count = 1.0
         self.threshold = random.randint(*SPAWN_CHANCE_RANGE)
-        try:
-            self.lock.release()
-        except RuntimeError:  # lock is not acquired
-            pass
         self.time = time
 
-    async def increase(self, message: discord.Message) -> bool:
-        # this is a deque, not a list
-        # its property is that, once the max length is reached (100 for us),
-        # the oldest element is removed, thus we only have the last 100 messages in memory
-        self.message_cache.append(
-            CachedMessage(content=message.content, author_id=message.author.id)
-        )
+    def on_cooldown(self, time: datetime) -> bool:
+        return time.timestamp() < self.next_eligible
 
-        if self.lock.locked():
-            return False
+    def increase(self, message: discord.Message) -> bool:
+        self.cache_message(message)
 
-        async with self.lock:
-            message_multiplier = 1
-            if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
-                message_multiplier /= 2
-            if message._state.intents.message_content and len(message.content) < 5:
-                message_multiplier /= 2
-            if len(set(x.author_id for x in self.message_cache)) < 4 or (
-                len(list(filter(lambda x: x.author_id == message.author.id, self.message_cache)))
-                / self.message_cache.maxlen  # type: ignore
-                > 0.4
-            ):
-                message_multiplier /= 2
-            self.scaled_message_count += message_multiplier
-            await asyncio.sleep(10)
+        if self.on_cooldown(message.created_at):
+            return False
+        self.next_eligible = message.created_at.timestamp() + MESSAGE_COOLDOWN
+
+        message_multiplier = 1
+        if message.guild.member_count < 5 or message.guild.member_count > 1000:  # type: ignore
+            message_multiplier /= 2
+        if message._state.intents.message_content and len(message.content) < 5:
+            message_multiplier /= 2
+        if self.distinct_authors < 4 or self.author_share(message.author.id) > 0.4:
+            message_multiplier /= 2
+        self.scaled_message_count += message_multiplier
         return True
 
 
 class SpawnManager(BaseSpawnManager):
+    # guilds without any message for this number of seconds are forgotten, losing their progress
+    idle_ttl: float = 6 * 3600
+    # number of seconds between two searches for idle guilds
+    sweep_interval: float = 600
+
     def __init__(self, bot: "BallsDexBot"):
         super().__init__(bot)
         self.cooldowns: dict[int, SpawnCooldown] = {}
+        self.last_sweep = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the state of all guilds, in bytes.
+        """
+        return sys.getsizeof(self.cooldowns) + sum(x.nbytes for x in self.cooldowns.values())
+
+    def evict_idle(self, now: float):
+        """
+        Forget the guilds that have been idle for more than `idle_ttl` seconds.
+        """
+        self.last_sweep = now
+        expiry = now - self.idle_ttl
+        # rebuilding the dict frees its memory, unlike deleting keys
+        self.cooldowns = {k: v for k, v in self.cooldowns.items() if v.last_message >= expiry}
+        spawn_manager_memory.labels(manager=type(self).__name__).set(self.nbytes)
+
+    def snapshot(self) -> bytes:
+        data = bytearray((SNAPSHOT_VERSION,))
+        for guild_id, cooldown in self.cooldowns.items():
+            data += cooldown.dump(guild_id)
+        return zlib.compress(data)
+
+    def restore(self, data: bytes):
+        cooldowns: dict[int, SpawnCooldown] = {}
+        try:
+            view = memoryview(zlib.decompress(data))
+            if view[0] != SNAPSHOT_VERSION:
+                log.warning("Ignoring spawn manager state saved in an older format")
+                return
+            offset = 1
+            while offset < len(view):
+                guild_id, cooldown, offset = SpawnCooldown.load(view, offset)
+                cooldowns[guild_id] = cooldown
+        except (zlib.error, struct.error, ValueError, IndexError):
+            log.warning("Could not restore the spawn manager state", exc_info=True)
+            return
+        self.cooldowns.update(cooldowns)
+        log.info(f"Restored the spawn state of {len(cooldowns)} guilds")
 
     async def handle_message(self, message: discord.Message) -> bool:
         guild = message.guild
         if not guild:
             return False
 
+        now = message.created_at.timestamp()
+        if now - self.last_sweep > self.sweep_interval:
+            self.evict_idle(now)
+
         cooldown = self.cooldowns.get(guild.id, None)
         if not cooldown:
             cooldown = SpawnCooldown(message.created_at)
             self.cooldowns[guild.id] = cooldown
+        cooldown.last_message = now
 
         delta_t = (message.created_at - cooldown.time).total_seconds()
-        # change how the threshold varies according to the member count, while nuking farm servers
         if not guild.member_count:
             return False
-        elif guild.member_count < 5:
-            time_multiplier = 0.1
-        elif guild.member_count < 100:
-            time_multiplier = 0.8
-        elif guild.member_count < 1000:
-            time_multiplier = 0.5
-        else:
-            time_multiplier = 0.2
+        time_multiplier = get_time_multiplier(guild.member_count)
 
         # manager cannot be increased more than once per 10 seconds
-        if not await cooldown.increase(message):
+        if not cooldown.increase(message):
             return False
 
         # normal increase, need to reach goal
@@ -210,37 +417,23 @@ class SpawnManager(BaseSpawnManager):
         embed.colour = discord.Colour.orange()
 
         delta = (interaction.created_at - cooldown.time).total_seconds()
-        # change how the threshold varies according to the member count, while nuking farm servers
-        if guild.member_count < 5:
-            multiplier = 0.1
-            range = "1-4"
-        elif guild.member_count < 100:
-            multiplier = 0.8
-            range = "5-99"
-        elif guild.member_count < 1000:
-            multiplier = 0.5
-            range = "100-999"
+        multiplier = get_time_multiplier(guild.member_count)
+        tier = bisect_right(MEMBER_COUNT_TIERS, guild.member_count)
+        lower = MEMBER_COUNT_TIERS[tier - 1] if tier else 1
+        if tier < len(MEMBER_COUNT_TIERS):
+            range = f"{lower}-{MEMBER_COUNT_TIERS[tier] - 1}"
         else:
-            multiplier = 0.2
-            range = "1000+"
+            range = f"{lower}+"
 
         penalities: list[str] = []
         if guild.member_count < 5 or guild.member_count > 1000:
             penalities.append("Server has less than 5 or more than 1000 members")
-        if any(len(x.content) < 5 for x in cooldown.message_cache):
+        if any(x < 5 for x in cooldown.content_lengths):
             penalities.append("Some cached messages are less than 5 characters long")
 
-        authors_set = set(x.author_id for x in cooldown.message_cache)
-        low_chatters = len(authors_set) < 4
+        low_chatters = cooldown.distinct_authors < 4
         # check if one author has more than 40% of messages in cache
-        major_chatter = any(
-            (
-                len(list(filter(lambda x: x.author_id == author, cooldown.message_cache)))
-                / cooldown.message_cache.maxlen  # type: ignore
-                > 0.4
-            )
-            for author in authors_set
-        )
+        major_chatter = any(cooldown.author_share(x) > 0.4 for x in cooldown.author_counts)
         # this mess is needed since either conditions make up to a single penality
         if low_chatters:
             if not major_chatter:
@@ -266,7 +459,7 @@ class SpawnManager(BaseSpawnManager):
         embed.description = (
             f"Manager initiated **{format_dt(cooldown.time, style='R')}**\n"
             f"Initial number of points to reach: **{cooldown.threshold}**\n"
-            f"Message cache length: **{len(cooldown.message_cache)}**\n\n"
+            f"Message cache length: **{cooldown.cached_messages}**\n\n"
             f"Time-based multiplier: **x{multiplier}** *({range} members)*\n"
             "*This affects how much the number of points to reach reduces over time*\n"
             f"Penality multiplier: **x{penality_multiplier}**\n"
@@ -275,7 +468,7 @@ class SpawnManager(BaseSpawnManager):
         )
 
         informations: list[str] = []
-        if cooldown.lock.locked():
+        if cooldown.on_cooldown(interaction.created_at):
             informations.append("The manager is currently on cooldown.")
         if delta < 600:
             informations.append(
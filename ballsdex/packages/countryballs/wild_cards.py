@@ -0,0 +1,74 @@
+import asyncio
+import io
+import logging
+import os
+
+from cachetools import LRUCache
+
+log = logging.getLogger("ballsdex.packages.countryballs.wild_cards")
+
+
+class WildCardCache:
+    """
+    Cache of the wild card files sent when spawning, to avoid reading them from the disk on
+    every spawn.
+
+    Entries are keyed by path and modification time like `AssetCache`, so replaced files are
+    read again.
+
+    Parameters
+    ----------
+    max_memory: int
+        Maximum size of the files kept, in bytes.
+    """
+
+    def __init__(self, max_memory: int = 64 * 1024 * 1024):
+        self.files: LRUCache[tuple[str, int], bytes] = LRUCache(maxsize=max_memory, getsizeof=len)
+
+    def get(self, path: str) -> bytes:
+        """
+        Return the content of the file at the given path.
+
+        Raises
+        ------
+        OSError
+            The file could not be read.
+        """
+        key = (path, os.stat(path).st_mtime_ns)
+        try:
+            return self.files[key]
+        except KeyError:
+            pass
+        data = self._read(path)
+        self._store(key, data)
+        return data
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as file:
+            return file.read()
+
+    def _store(self, key: tuple[str, int], data: bytes):
+        try:
+            self.files[key] = data
+        except ValueError:  # larger than the whole cache
+            pass
+
+    def open(self, path: str) -> io.BytesIO:
+        """
+        Return a file-like object of the content of the file, suitable for `discord.File`.
+        """
+        return io.BytesIO(self.get(path))
+
+    async def preload(self, paths: list[str]):
+        for path in paths:
+            try:
+                key = (path, os.stat(path).st_mtime_ns)
+                if key not in self.files:
+                    # only the reading is done in a thread, the cache is not thread-safe
+                    self._store(key, await asyncio.to_thread(self._read, path))
+            except OSError:
+                log.warning(f"Could not preload wild card {path}", exc_info=True)
+
+
+wild_card_cache = WildCardCache()
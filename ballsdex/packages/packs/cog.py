@@ -10,12 +10,20 @@ from discord import app_commands
 from discord.ext import commands
 from discord.ui import Button, View, button
 
-from ballsdex.core.models import Ball, BallInstance, PackInstance, Player, Special
+from ballsdex.core.counters import player_counters
+from ballsdex.core.models import (
+    Ball,
+    BallInstance,
+    CoinTransactionReason,
+    PackInstance,
+    Player,
+    Special,
+)
 from ballsdex.core.models import Packs as PackModel
 from ballsdex.core.utils.buttons import ConfirmChoiceView
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
 from ballsdex.core.utils.transformers import PackEnabledTransform
-from ballsdex.core.utils.utils import decide_collectible
+from ballsdex.core.utils.utils import decide_collectibles
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -96,13 +104,12 @@ async def open_pack(
             )
             pass
 
-    for _ in range(collectible_count):
-        if available_specified:
-            rarities = [ball.rarity for ball in available_specified]
-            collectible = random.choices(population=available_specified, weights=rarities, k=1)[0]
-        else:
-            collectible = decide_collectible()
-
+    collectibles = (
+        decide_collectibles(collectible_count, population=available_specified or None)
+        if collectible_count > 0
+        else []
+    )
+    for collectible in collectibles:
         applied_special: Special | None = None
 
         total_chance = sum(sp["chance"] for sp in special)
@@ -125,6 +132,7 @@ async def open_pack(
             attack_bonus=random.randint(-settings.max_attack_bonus, settings.max_attack_bonus),
             health_bonus=random.randint(-settings.max_health_bonus, settings.max_health_bonus),
         )
+        bot.card_renderer.prerender(cb)
 
         cb_txt = (
             cb.description(short=True, include_emoji=True, bot=bot)
@@ -142,8 +150,7 @@ async def open_pack(
     elif "currency_amount" in parsed:
         currency_reward = parsed["currency_amount"]
 
-    player.coins += currency_reward
-    await player.save()
+    await player.add_coins(currency_reward, CoinTransactionReason.PACK)
 
     grammar = (
         f"{settings.currency_name}" if currency_reward == 1 else f"{settings.plural_currency_name}"
@@ -408,7 +415,7 @@ class Packs(commands.GroupCog):
             The amount of packs to buy. Defaults to 1.
         """
         pack_to_buy = await PackModel.get(name=pack.name)
-        player = await Player.get(discord_id=interaction.user.id)
+        player = player_counters.merge(await Player.get(discord_id=interaction.user.id))
 
         total_price = pack_to_buy.price * amount
         gram = "" if amount == 1 else "s"
@@ -442,8 +449,13 @@ class Packs(commands.GroupCog):
         if not view.value:
             return
 
-        player.coins -= total_price
-        await player.save()
+        try:
+            await player.remove_coins(total_price, CoinTransactionReason.PACK)
+        except ValueError:
+            await interaction.followup.send(
+                f"You don't have enough coins to buy {amount} pack{gram}.", ephemeral=True
+            )
+            return
 
         for i in range(amount):
             await PackInstance.create(player=player, pack=pack_to_buy)
@@ -10,9 +10,12 @@ from discord.utils import format_dt
 from tortoise.exceptions import DoesNotExist
 from tortoise.expressions import Q
 
+from ballsdex.core.counters import player_counters
 from ballsdex.core.models import (
     BallInstance,
     Block,
+    CoinTransaction,
+    CoinTransactionReason,
     DonationPolicy,
     FriendPolicy,
     Friendship,
@@ -26,6 +29,7 @@ from ballsdex.core.models import (
 )
 from ballsdex.core.models import Player as PlayerModel
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_cache
 from ballsdex.core.utils.enums import (
     DONATION_POLICY_MAP,
     FRIEND_POLICY_MAP,
@@ -34,6 +38,7 @@ from ballsdex.core.utils.enums import (
 )
 from ballsdex.core.utils.enums import TRADE_COOLDOWN_POLICY_MAP as TRADE_POLICY_MAP
 from ballsdex.core.utils.paginator import FieldPageSource, Pages
+from ballsdex.core.utils.statistics import collection_statistics
 from ballsdex.settings import settings
 
 if TYPE_CHECKING:
@@ -149,8 +154,17 @@ class Player(commands.GroupCog):
             messages.append(f"Your friend request policy has been set to **{friends.name}**.")
 
         if messages:
+            # only save the policies, the counters are changed atomically elsewhere
+            await player.save(
+                update_fields=(
+                    "privacy_policy",
+                    "donation_policy",
+                    "trade_cooldown_policy",
+                    "mention_policy",
+                    "friend_policy",
+                )
+            )
             await interaction.response.send_message("\n".join(messages), ephemeral=True)
-            await player.save()
         else:
             await interaction.response.send_message("No policies were updated.", ephemeral=True)
             return
@@ -176,6 +190,7 @@ class Player(commands.GroupCog):
             return
 
         await BallInstance.filter(player=player, deleted=False).update(deleted=True)
+        completion_cache.invalidate([player.pk])
         await PackInstance.filter(player=player).delete()
 
         await interaction.followup.send("Your player data has been deleted.", ephemeral=True)
@@ -493,6 +508,7 @@ class Player(commands.GroupCog):
         Check your balance.
         """
         player, _ = await PlayerModel.get_or_create(discord_id=interaction.user.id)
+        player_counters.merge(player)
         plural = (
             f"{settings.currency_name}"
             if player.coins == 1
@@ -554,26 +570,18 @@ class Player(commands.GroupCog):
         await interaction.response.defer(thinking=True, ephemeral=True)
 
         try:
-            player = await PlayerModel.get(discord_id=interaction.user.id).prefetch_related(
-                "balls"
-            )
+            player = await PlayerModel.get(discord_id=interaction.user.id)
         except DoesNotExist:
             await interaction.followup.send("You haven't got any info to show!", ephemeral=True)
             return
 
-        ball = await BallInstance.filter(player=player, deleted=False).prefetch_related(
-            "special", "trade_player"
-        )
+        statistics = await collection_statistics(player=player)
 
         user = interaction.user
         bot_countryballs = {x: y.emoji_id for x, y in balls.items() if y.enabled}
         total_countryballs = len(bot_countryballs)
-        owned_countryballs = set(
-            x[0]
-            for x in await player.balls.filter(ball__enabled=True)
-            .distinct()
-            .values_list("ball_id")
-        )
+        completion = await completion_cache.get(player)
+        owned_countryballs = completion.ball_ids() & bot_countryballs.keys()
 
         if total_countryballs > 0:
             completion_percentage = (
@@ -582,9 +590,6 @@ class Player(commands.GroupCog):
         else:
             completion_percentage = "0.0%"
 
-        caught_owned = [x for x in ball if x.trade_player is None]
-        balls_owned = [x for x in ball]
-        special = [x for x in ball if x.special is not None]
         trades = await Trade.filter(
             Q(player1__discord_id=interaction.user.id) | Q(player2__discord_id=interaction.user.id)
         ).values_list("player1__discord_id", "player2__discord_id")
@@ -617,9 +622,10 @@ class Player(commands.GroupCog):
             f"**Amount of Blocked Users:** {blocks}\n"
             "## Player Stats\n"
             f"**Completion:** {completion_percentage}\n"
-            f"**{settings.collectible_name.title()}s Owned:** {len(balls_owned):,}\n"
-            f"**Caught {settings.collectible_name.title()}s Owned**: {len(caught_owned):,}\n"
-            f"**Special {settings.collectible_name.title()}s:** {len(special):,}\n"
+            f"**{settings.collectible_name.title()}s Owned:** {statistics.total:,}\n"
+            f"**Caught {settings.collectible_name.title()}s Owned**: "
+            f"{statistics.caught + statistics.packed:,}\n"
+            f"**Special {settings.collectible_name.title()}s:** {statistics.special:,}\n"
             f"**Trades Completed:** {len(trades):,}\n"
             f"**Amount of Users Traded With:** {len(trade_partners):,}"
         )
@@ -656,6 +662,7 @@ class Player(commands.GroupCog):
 
         new_player, _ = await PlayerModel.get_or_create(discord_id=user.id)
         old_player, _ = await PlayerModel.get_or_create(discord_id=interaction.user.id)
+        player_counters.merge(old_player)
 
         if new_player == old_player:
             await interaction.followup.send("You cannot give coins to yourself.", ephemeral=True)
@@ -683,8 +690,16 @@ class Player(commands.GroupCog):
 
         await interaction.response.defer(thinking=True)
 
-        await new_player.add_coins(amount)
-        await old_player.remove_coins(amount)
+        try:
+            await CoinTransaction.apply(
+                [(old_player, -amount), (new_player, amount)], CoinTransactionReason.DONATION
+            )
+        except ValueError:
+            await interaction.followup.send(
+                f"You don't have {amount} {settings.plural_currency_name} to give.",
+                ephemeral=True,
+            )
+            return
 
         plural = f"{settings.currency_name}" if amount == 1 else f"{settings.plural_currency_name}"
         await interaction.followup.send(
@@ -11,6 +11,7 @@ from discord.ext import commands, tasks
 from discord.utils import MISSING
 from tortoise.expressions import Q
 
+from ballsdex.core.counters import player_counters
 from ballsdex.core.models import BallInstance, Player
 from ballsdex.core.models import Trade as TradeModel
 from ballsdex.core.utils.buttons import ConfirmChoiceView
@@ -163,6 +164,8 @@ class Trade(commands.GroupCog):
 
         player1, _ = await Player.get_or_create(discord_id=interaction.user.id)
         player2, _ = await Player.get_or_create(discord_id=user.id)
+        player_counters.merge(player1)
+        player_counters.merge(player2)
         if player2.discord_id in self.bot.blacklist:
             await interaction.response.send_message(
                 "You cannot trade with a blacklisted user.", ephemeral=True
@@ -566,6 +569,8 @@ class TradeResetCog(commands.Cog):
 
     @tasks.loop(hours=24)
     async def reset_trades_at_midnight(self):
+        # the pending trades of yesterday must not be counted after the reset
+        await player_counters.flush()
         await Player.all().update(trades_today=0)
 
     @reset_trades_at_midnight.before_loop
@@ -9,8 +9,11 @@ import discord
 from discord.ui import Button, View, button
 from discord.utils import format_dt, utcnow
 
+from ballsdex.core.counters import player_counters
 from ballsdex.core.models import (
     BallInstance,
+    CoinTransaction,
+    CoinTransactionReason,
     Player,
     Trade,
     TradeCooldownPolicy,
@@ -18,6 +21,7 @@ from ballsdex.core.models import (
 )
 from ballsdex.core.utils import menus
 from ballsdex.core.utils.buttons import ConfirmChoiceView
+from ballsdex.core.utils.completion import completion_cache
 from ballsdex.core.utils.paginator import Pages
 from ballsdex.packages.balls.countryballs_paginator import CountryballsViewer
 from ballsdex.packages.trade.display import fill_trade_embed_fields
@@ -65,6 +69,7 @@ class TradeView(View):
             return
 
         player, _ = await Player.get_or_create(discord_id=interaction.user.id)
+        player_counters.merge(player)
         if player.coins < trader.coins:
             await interaction.response.send_message(
                 "The amount of coins in your proposal is more than the coins "
@@ -119,7 +124,7 @@ class TradeView(View):
         trader.proposal.clear()
 
         if trader.coins > 0:
-            await trader.player.add_coins(trader.coins)
+            await trader.player.add_coins(trader.coins, CoinTransactionReason.TRADE)
             trader.coins = 0
 
         await interaction.followup.send("Proposal cleared.", ephemeral=True)
@@ -190,6 +195,7 @@ class ConfirmView(View):
                 return
 
         player, _ = await Player.get_or_create(discord_id=interaction.user.id)
+        player_counters.merge(player)
         if player.coins < trader.coins:
             raise InvalidTradeOperation()
 
@@ -346,8 +352,8 @@ class TradeMenu:
         for countryball in self.trader1.proposal + self.trader2.proposal:
             await countryball.unlock()
 
-        await self.trader1.player.add_coins(self.trader1.coins)
-        await self.trader2.player.add_coins(self.trader2.coins)
+        await self.trader1.player.add_coins(self.trader1.coins, CoinTransactionReason.TRADE)
+        await self.trader2.player.add_coins(self.trader2.coins, CoinTransactionReason.TRADE)
 
         self.current_view.stop()
         for item in self.current_view.children:
@@ -390,6 +396,19 @@ class TradeMenu:
         trade = await Trade.create(player1=self.trader1.player, player2=self.trader2.player)
         await self.unlock_balls()
 
+        # exchange the coins in a single statement before moving any countryball, so that
+        # nothing is transferred if a player no longer has enough coins
+        try:
+            await CoinTransaction.apply(
+                [
+                    (self.trader1.player, self.trader2.coins - self.trader1.coins),
+                    (self.trader2.player, self.trader1.coins - self.trader2.coins),
+                ],
+                CoinTransactionReason.TRADE,
+            )
+        except ValueError:
+            raise InvalidTradeOperation()
+
         for countryball in self.trader1.proposal:
             countryball.player = self.trader2.player
             countryball.trade_player = self.trader1.player
@@ -408,26 +427,22 @@ class TradeMenu:
                 trade=trade, ballinstance=countryball, player=self.trader2.player
             )
 
-        if (
-            self.trader1.player.coins < self.trader1.coins
-            or self.trader2.player.coins < self.trader2.coins
-        ):
-            raise InvalidTradeOperation()
-
-        await self.trader1.player.add_coins(self.trader2.coins)
-        await self.trader1.player.remove_coins(self.trader1.coins)
-        await self.trader2.player.add_coins(self.trader1.coins)
-        await self.trader2.player.remove_coins(self.trader2.coins)
-
-        if self.trader1.player.trades_today < settings.max_profitable_trades_per_day:
-            await self.trader1.player.add_coins(5)
-        if self.trader2.player.trades_today < settings.max_profitable_trades_per_day:
-            await self.trader2.player.add_coins(5)
+        completion_cache.invalidate(
+            trader.player.pk for trader in (self.trader1, self.trader2) if trader.proposal
+        )
 
-        self.trader1.player.trades_today += 1
-        self.trader2.player.trades_today += 1
-        await self.trader1.player.save()
-        await self.trader2.player.save()
+        max_trades = settings.max_profitable_trades_per_day
+        await CoinTransaction.apply(
+            [
+                (trader.player, 5)
+                for trader in (self.trader1, self.trader2)
+                if trader.player.trades_today < max_trades
+            ],
+            CoinTransactionReason.TRADE,
+            buffered=True,
+        )
+        await self.trader1.player.add_activity(trades=1)
+        await self.trader2.player.add_activity(trades=1)
 
     async def unlock_balls(self):
         """
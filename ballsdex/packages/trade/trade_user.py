@@ -4,11 +4,12 @@ from typing import TYPE_CHECKING
 
 import discord
 
-from ballsdex.core.models import BlacklistedID
+from ballsdex.core.counters import player_counters
+from ballsdex.core.models import BlacklistedID, Player
 
 if TYPE_CHECKING:
     from ballsdex.core.bot import BallsDexBot
-    from ballsdex.core.models import BallInstance, Player, Trade
+    from ballsdex.core.models import BallInstance, Trade
 
 log = logging.getLogger("ballsdex.packages.trade")
 
@@ -32,7 +33,7 @@ class TradingUser:
 
     async def fetch_player_coins(self) -> int:
         player, _ = await Player.get_or_create(discord_id=self.user.id)
-        return player.coins
+        return player_counters.merge(player).coins
 
     @classmethod
     async def from_trade_model(
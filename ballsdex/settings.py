@@ -72,12 +72,34 @@ class Settings:
         List of packages the bot will load upon startup
     spawn_manager: str
         Python path to a class implementing `BaseSpawnManager`, handling cooldowns and anti-cheat
+    spawn_manager_state: str | None
+        File where the state of the spawn manager is saved across restarts, disabled if `None`
+    counters_flush_interval: int
+        Milliseconds between the writes of buffered coins and daily counters of players,
+        disabled if 0
     webhook_url: str | None
         URL of a Discord webhook for admin notifications
     client_id: str
         ID of the Discord application
     client_secret: str
         Secret key of the Discord application (not the bot token)
+    render_workers: int | None
+        Number of processes used to render cards, defaults to 2. Each one has its own caches
+    render_max_queue: int
+        Maximum number of cards being rendered at once before new requests have to wait
+    render_timeout: float
+        Number of seconds after which a card rendering request is abandoned
+    render_cache_directory: str | None
+        Directory where rendered cards are stored across restarts, disabled if `None`
+    render_cache_memory: int
+        Size in megabytes of the in-memory cache of rendered cards
+    render_layers_memory: int
+        Size in megabytes of the card templates kept by each rendering process, each template
+        takes about 11 MB
+    render_assets_memory: int
+        Size in megabytes of the decoded images kept by each rendering process
+    render_prerender: bool
+        Render the cards of newly obtained countryballs in the background
     """
 
     bot_token: str = ""
@@ -125,6 +147,18 @@ class Settings:
     prometheus_port: int = 15260
 
     spawn_manager: str = "ballsdex.packages.countryballs.spawn.SpawnManager"
+    spawn_manager_state: str | None = None
+    counters_flush_interval: int = 0
+
+    # card rendering
+    render_workers: int | None = None
+    render_max_queue: int = 64
+    render_timeout: float = 10
+    render_cache_directory: str | None = None
+    render_cache_memory: int = 256
+    render_layers_memory: int = 256
+    render_assets_memory: int = 256
+    render_prerender: bool = False
 
     # django admin panel
     webhook_url: str | None = None
@@ -201,6 +235,18 @@ def read_settings(path: "Path"):
     settings.spawn_manager = content.get(
         "spawn-manager", "ballsdex.packages.countryballs.spawn.SpawnManager"
     )
+    settings.spawn_manager_state = content.get("spawn-manager-state")
+    settings.counters_flush_interval = content.get("counters-flush-interval", 0)
+
+    if rendering := content.get("card-rendering"):
+        settings.render_workers = rendering.get("workers")
+        settings.render_max_queue = rendering.get("max-queue", 64)
+        settings.render_timeout = rendering.get("timeout", 10)
+        settings.render_cache_directory = rendering.get("cache-directory")
+        settings.render_cache_memory = rendering.get("cache-memory", 256)
+        settings.render_layers_memory = rendering.get("layers-memory", 256)
+        settings.render_assets_memory = rendering.get("assets-memory", 256)
+        settings.render_prerender = rendering.get("prerender", False)
 
     if admin := content.get("admin-panel"):
         settings.webhook_url = admin.get("webhook-url")
@@ -357,6 +403,38 @@ prometheus:
   port: 15260
 
 spawn-manager: ballsdex.packages.countryballs.spawn.SpawnManager
+# file where the spawn progress of servers is saved, to resume it after a restart, such as
+# spawn-manager-state.bin. the directory must be writable and kept across restarts
+# leave empty to start from scratch on every restart
+spawn-manager-state:
+
+# coins and daily trades/battles earned by players are kept in memory and written in batches
+# every given number of milliseconds, reducing the load on the database during busy events
+# leave to 0 to write them immediately
+counters-flush-interval: 0
+
+# card images are rendered in separate processes, leave the defaults if unsure
+card-rendering:
+  # number of processes, leave empty to use 2. each process has its own caches below (layers,
+  # assets and texts), raise this with care on hosts with many CPUs
+  workers:
+  # maximum number of cards rendered at once, additional requests will have to wait
+  max-queue: 64
+  # seconds after which a card rendering request is abandoned
+  timeout: 10
+  # rendered cards are kept in memory, this is the maximum size of that cache in megabytes
+  cache-memory: 256
+  # set a directory to also keep rendered cards on disk across restarts
+  cache-directory:
+  # each process keeps the parts shared by all instances of a card, size in megabytes
+  # a card takes about 11MB and this only speeds up the cards rendered repeatedly (events),
+  # raising it to fit a whole dex is not worth the memory
+  layers-memory: 256
+  # each process keeps the decoded images (backgrounds, icons...), size in megabytes
+  assets-memory: 256
+  # render the cards of caught, packed and given countryballs in the background, so that they
+  # can be displayed instantly. this uses more CPU, even for cards that are never displayed
+  prerender: false
 
 # sentry details, leave empty if you don't know what this is
 # https://sentry.io/ for error tracking